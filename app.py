@@ -1,23 +1,61 @@
 import streamlit as st
+import os
 import time
 import base64
 import uuid
-from ui_components import render_jarvis_ui, render_subtitles
+from ui_components import inject_styles, render_jarvis_ui, render_subtitles, render_audio_chunk, render_log
 import voice_engine
 import backend
+import tracing
 
 # --- PAGE CONFIG ---
 st.set_page_config(layout="centered", page_title="N.A.O.M.I. Core")
 
+# Speak each sentence as soon as Gemini streams it, instead of waiting for the whole reply
+STREAMING_VOICE = True
+
+# The reactor goes back to idle this long after the reply's audio should have finished
+PLAYBACK_MARGIN = 0.5
+# Without audio, subtitles stay up for roughly the time it takes to read them
+READING_SECONDS_PER_CHAR = 0.07
+
+# The System Log shows this many recent messages; "Show earlier" pages back by the same amount
+LOG_PAGE = 50
+
+# Per-stage latency histograms and the last turn's spans, under the log (NAOMI_DIAGNOSTICS=1)
+SHOW_DIAGNOSTICS = os.getenv("NAOMI_DIAGNOSTICS") == "1"
+
 # --- SESSION STATE ---
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "last_audio" not in st.session_state:
     st.session_state.last_audio = None
+if "chat_session" not in st.session_state:
+    st.session_state.chat_session = None
+if "turn_stats" not in st.session_state:
+    st.session_state.turn_stats = []
+if "log_limit" not in st.session_state:
+    st.session_state.log_limit = LOG_PAGE
+if "speaking" not in st.session_state:
+    st.session_state.speaking = None # {"until": epoch seconds, "text": reply} while the browser is still playing it
+
+# --- AUDIO WARM-UP ---
+@st.cache_resource
+def start_presynthesis():
+    # Once per process: fixed replies get their audio cached in the background
+    return voice_engine.presynthesize(backend.STOCK_PHRASES)
+
+start_presynthesis()
+
+@st.cache_resource
+def start_journal_replay():
+    # Once per process: sheet rows a crashed run left unsent go out now, not at the next added task
+    return backend.replay_journal_in_background()
+
+start_journal_replay()
 
 # --- CSS ARCHITECTURE ---
-st.markdown("""
-<style>
+APP_CSS = """
     /* 1. DARK THEME & CHAT LOG STYLING */
     .stApp { background-color: #050505; }
     
@@ -103,50 +141,132 @@ st.markdown("""
 
     header, footer {visibility: hidden;}
 
-</style>
-""", unsafe_allow_html=True)
+"""
+
+# Sent once per browser session together with the reactor styles; reruns only send markup
+inject_styles(APP_CSS)
 
 
 # --- MAIN PROCESSOR ---
+def get_chat_session():
+    # One Gemini session per browser session; seeded with any log from before it existed
+    if st.session_state.chat_session is None:
+        st.session_state.chat_session = backend.ChatSession(st.session_state.messages[:-1])
+    return st.session_state.chat_session
+
+def speak_streaming(user_text):
+    """
+    Streams the reply sentence by sentence: subtitles grow and audio chunks queue up as they arrive.
+    Returns the full reply text.
+    """
+    stats = {}
+    spoken = []
+    audio_slot = st.container()
+    first_audio_at = None
+    try:
+        text_stream = backend.stream_message(user_text, st.session_state.messages, session=get_chat_session())
+        for sentence, audio_bytes in voice_engine.stream_audio_response(text_stream, stats):
+            spoken.append(sentence)
+            if len(spoken) == 1:
+                placeholder_visual.empty()
+            with placeholder_visual.container():
+                render_jarvis_ui("speaking")
+                render_subtitles(" ".join(spoken))
+            with audio_slot:
+                render_audio_chunk(audio_bytes)
+            if audio_bytes and first_audio_at is None:
+                first_audio_at = time.time()
+    except Exception as e:
+        spoken.append(f"System Error: {e}")
+
+    st.session_state.turn_stats.append(stats)
+    reply = " ".join(spoken)
+    # Sentences play back to back from the first one, so playback ends audio_seconds after it started
+    speak_until(reply, first_audio_at, stats.get('audio_seconds', 0.0))
+    return reply
+
+def speak_until(text, started_at, audio_seconds):
+    """
+    Records how long the reply keeps the reactor speaking, from the real length of its audio.
+    """
+    if audio_seconds and started_at:
+        until = started_at + audio_seconds + PLAYBACK_MARGIN
+    else:
+        until = time.time() + len(text) * READING_SECONDS_PER_CHAR
+    st.session_state.speaking = {"until": until, "text": text}
+
+def render_reactor():
+    """
+    Draws the reactor for the current state. A reply still playing stays in the speaking state
+    (with its subtitles) across reruns, and the browser hands back to idle when it ends.
+    """
+    speaking = st.session_state.speaking
+    remaining = speaking["until"] - time.time() if speaking else 0
+    placeholder_visual.empty()
+    with placeholder_visual.container():
+        if remaining > 0:
+            render_jarvis_ui("speaking", then="idle", after=remaining)
+            render_subtitles(speaking["text"], hide_after=remaining)
+        else:
+            st.session_state.speaking = None
+            render_jarvis_ui("idle")
+
+def show_earlier():
+    st.session_state.log_limit += LOG_PAGE
+
+def refresh_log():
+    # Redrawn in place after each command, so a turn needs no extra rerun to show up
+    with log_slot.container():
+        if not st.session_state.messages:
+            st.caption("System Initialized. Awaiting Input...")
+        render_log(st.session_state.messages, st.session_state.log_limit)
+
 def process_command(user_text):
+    with tracing.span("command", streaming=STREAMING_VOICE):
+        run_command(user_text)
+
+def run_command(user_text):
     
     # 1. VISUAL: THINKING (Amber)
+    st.session_state.speaking = None
     placeholder_visual.empty()
     with placeholder_visual.container():
         render_jarvis_ui("thinking")
     
-    # 2. LOGIC: BACKEND
-    try:
-        ai_response = backend.process_message(user_text, st.session_state.messages)
-    except Exception as e:
-        ai_response = f"System Error: {e}"
-        
-    st.session_state.messages.append({"role": "assistant", "content": ai_response})
-    
-    # 3. VISUAL: SPEAKING (Green + Subtitles)
-    placeholder_visual.empty()
-    with placeholder_visual.container():
-        render_jarvis_ui("speaking")
-        render_subtitles(ai_response)
+    if STREAMING_VOICE:
+        # 2-4. LOGIC, VISUAL AND AUDIO, one sentence at a time
+        ai_response = speak_streaming(user_text)
+        st.session_state.messages.append({"role": "assistant", "content": ai_response})
+    else:
+        # 2. LOGIC: BACKEND
+        try:
+            ai_response = backend.process_message(user_text, st.session_state.messages, session=get_chat_session())
+        except Exception as e:
+            ai_response = f"System Error: {e}"
+            
+        st.session_state.messages.append({"role": "assistant", "content": ai_response})
         
-    # 4. AUDIO: NATIVE AUTOPLAY
-    audio_io = voice_engine.get_audio_response(ai_response)
-    if audio_io:
-        st.audio(audio_io, format="audio/mp3", autoplay=True)
+        # 3. VISUAL: SPEAKING (Green + Subtitles)
+        placeholder_visual.empty()
+        with placeholder_visual.container():
+            render_jarvis_ui("speaking")
+            render_subtitles(ai_response)
+            
+        # 4. AUDIO: AUTOPLAY (queued in the page, so it keeps playing through reruns)
+        audio_io = voice_engine.get_audio_response(ai_response)
+        audio_bytes = audio_io.getvalue() if audio_io else None
+        render_audio_chunk(audio_bytes)
+        speak_until(ai_response, time.time(), voice_engine.audio_duration(audio_bytes))
 
-    # 5. RETURN TO IDLE
-    time.sleep(max(3, len(ai_response) * 0.07))
-    placeholder_visual.empty()
-    with placeholder_visual.container():
-        render_jarvis_ui("idle")
+    # 5. RETURN TO IDLE: timed in the browser from the audio length; the script run ends here
+    render_reactor()
 
 
 # --- UI LAYOUT STACK ---
 
 # 1. THE REACTOR (Visual Core)
 placeholder_visual = st.empty()
-with placeholder_visual.container():
-    render_jarvis_ui("idle")
+render_reactor()
 
 # 2. SPACER
 st.write("")
@@ -157,16 +277,11 @@ audio_value = st.audio_input("Voice Uplink")
 # 4. THE SYSTEM LOG (Scrollable Native Markdown Container)
 st.markdown("### 📝 System Log")
 with st.container(height=250, border=True):
-    if not st.session_state.messages:
-        st.caption("System Initialized. Awaiting Input...")
-    
-    for msg in st.session_state.messages:
-        if msg["role"] == "user":
-            st.markdown(f"<span style='color:#00f3ff; font-weight:bold;'>[USER UPLINK]:</span> {msg['content']}", unsafe_allow_html=True)
-        else:
-            # AI responses use standard markdown, rendering bullets beautifully
-            st.markdown(f"<span style='color:#00ff9d; font-weight:bold;'>[N.A.O.M.I]:</span>\n\n{msg['content']}", unsafe_allow_html=True)
-        st.divider()
+    hidden = len(st.session_state.messages) - st.session_state.log_limit
+    if hidden > 0:
+        st.button(f"Show {min(hidden, LOG_PAGE)} earlier messages", on_click=show_earlier, type="tertiary")
+    log_slot = st.empty()
+    refresh_log()
 
 # 5. THE TEXT INPUT (Native Chat Bar)
 # This will lock to the bottom of the screen automatically
@@ -175,10 +290,15 @@ text_input = st.chat_input("Message N.A.O.M.I...")
 
 # --- LOGIC CONTROL ---
 
+def submit_command(user_text):
+    st.session_state.messages.append({"role": "user", "content": user_text})
+    refresh_log() # Show the message in the log instantly, then process
+    process_command(user_text)
+    refresh_log()
+
 # Triggered by Text
 if text_input:
-    st.session_state.messages.append({"role": "user", "content": text_input})
-    st.rerun() # Refresh to show the message in the log instantly, then process
+    submit_command(text_input)
     
 # Triggered by Voice
 if audio_value and audio_value != st.session_state.last_audio:
@@ -188,23 +308,29 @@ if audio_value and audio_value != st.session_state.last_audio:
     with placeholder_visual.container():
         render_jarvis_ui("thinking")
         
-    with open("temp_input.wav", "wb") as f:
-        f.write(audio_value.read())
-        
-    detected_text = voice_engine.transcribe_audio("temp_input.wav")
+    detected_text = voice_engine.transcribe_audio(audio_value.getvalue())
     
     if detected_text:
-        st.session_state.messages.append({"role": "user", "content": detected_text})
-        process_command(detected_text)
-        st.rerun() # Refresh to show final log
+        submit_command(detected_text)
     else:
         with placeholder_visual.container():
             render_jarvis_ui("idle")
 
-# Process text command if it's pending (happens after st.rerun() from text input)
-if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-    # Ensure it hasn't been processed yet by checking if the last message is from the user
-    # (Since process_command appends the AI's response)
-    last_msg = st.session_state.messages[-1]["content"]
-    process_command(last_msg)
-    st.rerun() # Final refresh to show AI's response in the log
\ No newline at end of file
+# 6. DIAGNOSTICS (optional, last so they include this run's turn)
+if SHOW_DIAGNOSTICS:
+    with st.expander("Diagnostics"):
+        st.json({"tts_cache": voice_engine.audio_cache.report(), "response_cache": backend.response_cache.report()}, expanded=False)
+        voice_turn = next((s for s in reversed(st.session_state.turn_stats) if 'time_to_first_audio' in s and 'total_time' in s), None)
+        if voice_turn:
+            st.caption(f"Last voice turn: first audio after {voice_turn['time_to_first_audio'] * 1000:.0f} ms, "
+                       f"turn {voice_turn['total_time'] * 1000:.0f} ms")
+        histograms = tracing.tracer.histograms()
+        if histograms:
+            st.dataframe([{"stage": name, **row} for name, row in histograms.items()], hide_index=True)
+        last_command = next((s for s in reversed(tracing.tracer.recent) if s.name == "command"), None)
+        if last_command:
+            st.caption("Last turn")
+            st.dataframe([
+                {"stage": s.name, "ms": round(s.duration * 1000, 1), **s.attributes}
+                for s in tracing.tracer.recent if s.trace_id == last_command.trace_id
+            ], hide_index=True)
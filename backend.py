@@ -1,19 +1,31 @@
 import os
 import datetime
 import traceback
-import smtplib
 import time
 import json
 import pytz 
 import re
-from email.mime.text import MIMEText
+import threading
+import functools
+import hashlib
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-import google.generativeai as genai
-from google.api_core.exceptions import ResourceExhausted, DeadlineExceeded, ServiceUnavailable
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+# The Google SDKs (generativeai, discovery, auth) and streamlit are imported where they are first
+# needed, so importing this module stays cheap and does no network I/O.
 from dotenv import load_dotenv
-import streamlit as st
+
+from batch_writer import BatchWriter
+from calendar_store import EventStore
+from http_pool import HttpPool
+from key_pool import KeyPool
+from memory import ConversationMemory, estimate_tokens
+from notifier import NotificationDispatcher
+import intents
+from response_cache import ResponseCache
+from sheets_journal import SheetsJournal
+import tracing
 
 # --- CONFIGURATION ---
 load_dotenv()
@@ -27,6 +39,50 @@ CALENDAR_ID = 'c_fa9eefe809ded84d84f33c8b11369b569f78d88491d6595b5673ec98a6869fb
 SHEET_RANGE = 'WeeklyOverhaul!A:F'
 TIMEZONE = 'America/New_York' 
 
+# TOOL EXECUTION
+MAX_TOOL_STEPS = int(os.getenv("MAX_TOOL_STEPS", 4)) # Model -> tools -> model rounds allowed per turn
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", 16)) # shared by every turn; server.py admits this many turns at once
+DEFAULT_TOOL_TIMEOUT = 20 # seconds
+MAX_SCHEDULE_DAYS = 31 # Longest range check_schedule covers in one call
+TOOL_TIMEOUTS = {'send_notification': 5, 'list_upcoming_events': 10, 'check_schedule': 10, 'find_free_slots': 10}
+
+# MODEL REQUESTS
+MODEL_ATTEMPTS = 2 # Tries per model request, each on the healthiest available key
+# Duplicate a model request onto a second key if it is still pending after this many seconds (0 = off)
+HEDGE_AFTER = float(os.getenv("HEDGE_AFTER_SECONDS", 0))
+
+# MEMORY
+# Estimated tokens of conversation replayed each turn; older turns are folded into a running summary
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", 2000))
+
+# LOCAL FAST PATH
+# Simple commands ("what's on today") are answered without Gemini when the parser is at least this sure
+FAST_PATH_MIN_CONFIDENCE = 0.8
+
+# RESPONSE CACHE
+# Answers to read-only questions are reused while the calendar is unchanged, for at most RESPONSE_CACHE_TTL seconds
+RESPONSE_CACHE_SIZE = 128
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_CONTEXT = 2 # exchanges of conversation a follow-up's cached reply is keyed on
+
+# How long (seconds) the in-memory calendar may be served before an incremental sync
+EVENT_CACHE_MAX_AGE = float(os.getenv("EVENT_CACHE_MAX_AGE", 60))
+
+# Sheets rows are journaled locally and appended in batches every SHEETS_FLUSH_INTERVAL seconds
+SHEETS_JOURNAL_PATH = os.getenv("SHEETS_JOURNAL_PATH", "sheets_journal.db")
+SHEETS_FLUSH_INTERVAL = float(os.getenv("SHEETS_FLUSH_INTERVAL", 5))
+
+# NOTIFICATIONS
+# Emails are sent by a background dispatcher; point SMTP_HOST/SMTP_PORT at a local server (SMTP_SSL=0) to test
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") != "0"
+NOTIFY_DIGEST_WINDOW = float(os.getenv("NOTIFY_DIGEST_WINDOW", 2)) # seconds a burst may take to coalesce into one email
+NOTIFY_MIN_INTERVAL = float(os.getenv("NOTIFY_MIN_INTERVAL", 10)) # seconds between two emails
+
+# GOOGLE API TRANSPORTS
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 8)) # authorized connections shared by every session and tool thread
+
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/calendar']
 
 # --- SMART CATEGORIES ---
@@ -35,13 +91,15 @@ VALID_CATEGORIES = ["Combat Robotics", "Rocket Propulsion", "IEEE", "Fluids Rese
 
 # --- AUTHENTICATION & KEY ROTATION ---
 api_keys = []
-current_key_index = 0
+key_pool = None
 creds = None
 email_user = None
 email_pass = None
 
 def initialize_auth():
-    global creds, email_user, email_pass
+    global creds, email_user, email_pass, key_pool
+    import streamlit as st
+    from google.oauth2 import service_account
     
     # 1. Try Streamlit Secrets (Cloud)
     try:
@@ -94,31 +152,223 @@ def initialize_auth():
         except Exception as e:
             print(f"Local auth failed: {e}")
 
-    if api_keys:
-        genai.configure(api_key=api_keys[0])
-    else:
+    # Each key gets its own client via the pool; the global genai.configure state is never touched
+    key_pool = KeyPool(api_keys)
+    if not api_keys:
         print("❌ CRITICAL: No API Keys found.")
 
-# Initialize Auth immediately
-initialize_auth()
+def lazy(builder):
+    """
+    Memoizes a zero-argument builder. Nothing is built until first use, and only once across threads.
+    """
+    lock = threading.Lock()
+    built = []
 
-# Build Services
-try:
-    sheets_service = build('sheets', 'v4', credentials=creds)
-    calendar_service = build('calendar', 'v3', credentials=creds)
-except Exception as e:
-    print(f"⚠️ Service Build Error (Check Credentials): {e}")
-    sheets_service = None
-    calendar_service = None
+    @functools.wraps(builder)
+    def get():
+        if not built:
+            with lock:
+                if not built: built.append(builder())
+        return built[0]
 
-# --- HELPER FUNCTIONS ---
-def switch_api_key():
-    global current_key_index
-    if len(api_keys) <= 1: return False
-    current_key_index = (current_key_index + 1) % len(api_keys)
-    genai.configure(api_key=api_keys[current_key_index])
+    def set(value):
+        with lock: built[:] = [value]
+
+    def reset():
+        with lock: built.clear()
+
+    get.set, get.reset = set, reset
+    return get
+
+@lazy
+def ensure_auth():
+    initialize_auth()
     return True
 
+def get_key_pool():
+    context = _context.get()
+    if context: return context.pool
+    ensure_auth()
+    return key_pool
+
+@lazy
+def get_services():
+    """
+    (sheets_service, calendar_service), built from the discovery documents bundled with
+    google-api-python-client, so no discovery fetch goes over the network.
+    """
+    ensure_auth()
+    from googleapiclient.discovery import build
+    try:
+        sheets = build('sheets', 'v4', credentials=creds, static_discovery=True)
+        calendar = build('calendar', 'v3', credentials=creds, static_discovery=True)
+        return sheets, calendar
+    except Exception as e:
+        print(f"⚠️ Service Build Error (Check Credentials): {e}")
+        return None, None
+
+def get_sheets_service():
+    context = _context.get()
+    return context.sheets_service if context else get_services()[0]
+
+def get_calendar_service():
+    context = _context.get()
+    return context.calendar_service if context else get_services()[1]
+
+@lazy
+def get_http_pool():
+    # httplib2 is not thread-safe: each request borrows an authorized transport from this pool
+    import google_auth_httplib2
+    import httplib2
+    return HttpPool(lambda: google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http()), size=HTTP_POOL_SIZE)
+
+def execute(request):
+    if creds is None: return request.execute()
+    return get_http_pool().execute(request)
+
+def build_event_store(calendar_service, execute):
+    # Local mirror of CALENDAR_ID; seeded on first read
+    if not calendar_service: return None
+    return EventStore(calendar_service, CALENDAR_ID, TIMEZONE, EVENT_CACHE_MAX_AGE, execute=execute)
+
+def build_calendar_writer(calendar_service, execute):
+    # All Calendar mutations go through one batch layer, so writes issued in the same turn share round trips
+    if not calendar_service: return None
+    return BatchWriter(calendar_service.new_batch_http_request, execute=execute)
+
+def build_sheets_journal(sheets_service, execute, path):
+    # Write-behind log for the task sheet; replays anything a previous run left unsent
+    if not sheets_service: return None
+    journal = SheetsJournal(sheets_service, SPREADSHEET_ID, SHEET_RANGE, path=path, interval=SHEETS_FLUSH_INTERVAL, execute=execute)
+    journal.start()
+    return journal
+
+_event_store = lazy(lambda: build_event_store(get_services()[1], execute))
+_calendar_writer = lazy(lambda: build_calendar_writer(get_services()[1], execute))
+_sheets_journal = lazy(lambda: build_sheets_journal(get_services()[0], execute, SHEETS_JOURNAL_PATH))
+
+def get_event_store():
+    context = _context.get()
+    return context.event_store() if context else _event_store()
+
+def get_calendar_writer():
+    context = _context.get()
+    return context.calendar_writer() if context else _calendar_writer()
+
+def get_sheets_journal():
+    context = _context.get()
+    return context.sheets_journal() if context else _sheets_journal()
+
+def get_notifier():
+    context = _context.get()
+    return context.notifier if context else _notifier()
+
+@lazy
+def _notifier():
+    # One dispatcher (and one warm SMTP connection) per process
+    ensure_auth()
+    if not email_user or (not email_pass and SMTP_HOST == "smtp.gmail.com"): return None
+    notifier = NotificationDispatcher(
+        email_user, email_pass, host=SMTP_HOST, port=SMTP_PORT, use_ssl=SMTP_SSL,
+        window=NOTIFY_DIGEST_WINDOW, min_interval=NOTIFY_MIN_INTERVAL
+    )
+    notifier.start()
+    return notifier
+
+def use_services(calendar=None, sheets=None, pool=None, notifier=None):
+    """
+    Points the backend at other service objects, e.g. the offline fakes in fakes.py.
+    Meant for offline runs: credentials are never loaded afterwards. Components built on
+    the previous services (event store, batch writer, journal) are rebuilt on next use.
+    """
+    global key_pool
+    ensure_auth.set(True)
+    if pool is not None: key_pool = pool
+    if calendar is not None or sheets is not None: get_services.set((sheets, calendar))
+    if notifier is not None: _notifier.set(notifier)
+    for component in (_event_store, _calendar_writer, _sheets_journal): component.reset()
+    response_cache.invalidate()
+
+# --- SESSION CONTEXTS ---
+_context = contextvars.ContextVar("backend_context", default=None)
+
+class BackendContext:
+    """
+    The services one session works against: key pool, Google clients and their HTTP transports,
+    calendar mirror and writer, sheet journal, notifier and response cache.
+    Sessions without one share the process-wide services built from the credentials.
+    Turns run inside their session's context and tool threads inherit it (tracing.wrap copies it),
+    so sessions with their own contexts (per-user credentials, the offline fakes) never see each other's state.
+    """
+    def __init__(self, calendar=None, sheets=None, pool=None, notifier=None, http_pool=None, journal_path=None):
+        if sheets is not None and not journal_path:
+            raise ValueError("A context with a Sheets service needs its own journal_path (':memory:' for a throwaway one).")
+        self.calendar_service = calendar
+        self.sheets_service = sheets
+        self.pool = pool
+        self.notifier = notifier
+        # None: the shared pool once credentials are loaded. Contexts with their own credentials pass a pool built on them
+        self.http_pool = http_pool
+        self.journal_path = journal_path
+        self.response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        self.event_store = lazy(lambda: build_event_store(self.calendar_service, self.execute))
+        self.calendar_writer = lazy(lambda: build_calendar_writer(self.calendar_service, self.execute))
+        self.sheets_journal = lazy(lambda: build_sheets_journal(self.sheets_service, self.execute, self.journal_path))
+
+    def execute(self, request):
+        # Never the client's own transport while credentials are loaded: it is not thread-safe
+        if self.http_pool is None: return execute(request)
+        return self.http_pool.execute(request)
+
+@contextlib.contextmanager
+def activate(context):
+    """
+    Runs the block against `context` (None: the process-wide services).
+    """
+    if context is None:
+        yield
+        return
+    token = _context.set(context)
+    try:
+        yield
+    finally:
+        try:
+            _context.reset(token)
+        except ValueError:
+            pass # A streaming turn's generator was closed from another context
+
+def get_response_cache():
+    context = _context.get()
+    return context.response_cache if context else response_cache
+
+def warm_up():
+    """
+    Builds everything up front (auth, clients, journal replay). Optional: every getter is lazy.
+    """
+    get_key_pool()
+    get_event_store()
+    get_calendar_writer()
+    get_sheets_journal()
+    get_notifier()
+    get_tool_library()
+
+def replay_journal_in_background():
+    """
+    Builds the process-wide Sheets journal on a background thread, so rows a crashed run left unsent are
+    replayed at startup rather than whenever a task is next added. Call it from the app or server entry point:
+    importing backend stays free of network I/O.
+    """
+    def replay():
+        try:
+            get_sheets_journal()
+        except Exception as e:
+            print(f"Sheets journal replay failed: {e}")
+
+    thread = threading.Thread(target=replay, name="journal-replay", daemon=True)
+    thread.start()
+    return thread
+
+# --- HELPER FUNCTIONS ---
 def get_current_time():
     tz = pytz.timezone(TIMEZONE)
     return datetime.datetime.now(tz).strftime("%A, %B %d, %Y at %I:%M %p %Z")
@@ -178,14 +428,10 @@ def parse_smart_time(time_input, original_date_obj=None):
 
 # --- TOOLS ---
 def list_upcoming_events(max_results: float = 10):
+    calendar_service = get_calendar_service()
     if not calendar_service: return "Calendar service unavailable."
     try:
-        tz = pytz.timezone(TIMEZONE)
-        now = datetime.datetime.now(tz).isoformat()
-        events_result = calendar_service.events().list(
-            calendarId=CALENDAR_ID, timeMin=now, maxResults=int(max_results), singleEvents=True, orderBy='startTime'
-        ).execute()
-        events = events_result.get('items', [])
+        events = get_event_store().upcoming(int(max_results))
         if not events: return "No upcoming events found."
         
         # Return raw data for AI to narrate
@@ -198,14 +444,18 @@ def list_upcoming_events(max_results: float = 10):
         return data_str
     except Exception as e: return f"Error fetching events: {str(e)}"
 
-def check_schedule(date_str: str = "today"):
+def check_schedule(date_str: str = "today", days: float = 1):
+    """
+    Events on date_str, or on `days` consecutive days starting at date_str (days=7 for a week), grouped by day.
+    """
+    calendar_service = get_calendar_service()
     if not calendar_service: return "Calendar service unavailable."
     try:
+        days = max(1, min(int(days), MAX_SCHEDULE_DAYS))
         start_iso, end_iso = get_date_range(date_str)
-        events_result = calendar_service.events().list(
-            calendarId=CALENDAR_ID, timeMin=start_iso, timeMax=end_iso, singleEvents=True, orderBy='startTime'
-        ).execute()
-        events = events_result.get('items', [])
+        if days > 1: return describe_schedule_range(date_str, get_event_store().days(start_iso, days))
+
+        events = get_event_store().between(start_iso, end_iso)
         if not events: return f"No events found for {date_str}."
         
         data_str = f"Events for {date_str}: "
@@ -217,7 +467,19 @@ def check_schedule(date_str: str = "today"):
         return data_str
     except Exception as e: return f"Error checking schedule: {str(e)}"
 
-def add_to_schedule(summary: str, date_time: str, item_type: str, category: str, notes: str = "", duration_hours: float = 1.0):
+def describe_schedule_range(date_str, days):
+    # One line per day, so the model can narrate a week from a single tool call
+    data_str = f"Events for the {len(days)} days from {date_str}: "
+    for day, events in days:
+        listed = " ".join(
+            f"{format_event_time(e['start'].get('dateTime', e['start'].get('date')))}: {e.get('summary', 'No Title')}."
+            for e in events
+        )
+        data_str += f"{day.strftime('%A, %B %d')}: {listed or 'nothing.'} "
+    return data_str
+
+def add_to_schedule(summary: str, date_time: str, item_type: str, category: str, notes: str = "", duration_hours: float = 1.0, force: bool = False):
+    calendar_service = get_calendar_service()
     if not calendar_service: return "Calendar service unavailable."
     try:
         if item_type not in VALID_TYPES: item_type = "To-Do Item"
@@ -231,35 +493,79 @@ def add_to_schedule(summary: str, date_time: str, item_type: str, category: str,
             start_time = tz.localize(start_time)
 
         end_time = start_time + datetime.timedelta(hours=duration_hours)
+
+        # Overlaps are reported instead of silently double-booking; force=True books anyway
+        conflicts = get_event_store().conflicts(start_time, end_time)
+        if conflicts and not force:
+            clashes = ", ".join(
+                f"{e.get('summary', 'No Title')} at {format_event_time(e['start']['dateTime'])}" for e in conflicts
+            )
+            return f"Not added: '{summary}' would overlap {clashes}. Ask the user; call again with force=True to add it anyway."
+
         event = {
             'summary': f"[{category}] {summary}",
             'description': f"Type: {item_type}\nNotes: {notes}",
             'start': {'dateTime': start_time.isoformat(), 'timeZone': TIMEZONE},
             'end': {'dateTime': end_time.isoformat(), 'timeZone': TIMEZONE},
         }
-        calendar_service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
+        created = get_calendar_writer().submit(calendar_service.events().insert(calendarId=CALENDAR_ID, body=event)).result()
+        get_event_store().upsert(created)
+        get_response_cache().invalidate()
         
-        if sheets_service:
+        # The sheet row goes out with the next journal flush; the Calendar write is what the user waits on
+        sheets_journal = get_sheets_journal()
+        if sheets_journal:
             formatted_date = start_time.strftime("%m/%d/%Y %H:%M")
-            values = [[formatted_date, summary, item_type, category, notes, False]]
-            sheets_service.spreadsheets().values().append(
-                spreadsheetId=SPREADSHEET_ID, range=SHEET_RANGE, valueInputOption="USER_ENTERED", body={'values': values}
-            ).execute()
+            sheets_journal.append([formatted_date, summary, item_type, category, notes, False])
             
         return f"Added '{summary}' to your schedule."
     except Exception as e: return f"Error adding task: {str(e)}"
 
+def find_free_slots(date_str: str = "today", duration_minutes: float = 60, earliest: str = "08:00", latest: str = "22:00", days: float = 1):
+    """
+    Free gaps of at least duration_minutes between earliest and latest (HH:MM) on date_str, or on `days` days from it.
+    """
+    calendar_service = get_calendar_service()
+    if not calendar_service: return "Calendar service unavailable."
+    try:
+        free = free_slots_by_day(date_str, duration_minutes, earliest, latest, days)
+        data_str = f"Free slots of at least {int(duration_minutes)} minutes: "
+        for day, slots in free:
+            listed = ", ".join(f"{format_event_time(s.isoformat())} to {format_event_time(e.isoformat())}" for s, e in slots)
+            data_str += f"{day.strftime('%A, %B %d')}: {listed or 'none'}. "
+        return data_str
+    except Exception as e: return f"Error finding free time: {str(e)}"
+
+def free_slots_by_day(date_str="today", duration_minutes=60, earliest="08:00", latest="22:00", days=1):
+    """
+    [(date, [(start_dt, end_dt)])]: each day's gaps inside the earliest..latest window, never in the past.
+    """
+    event_store = get_event_store()
+    start_iso, _ = get_date_range(date_str)
+    first_day = datetime.datetime.fromisoformat(start_iso)
+    now = datetime.datetime.now(pytz.timezone(TIMEZONE))
+    min_duration = datetime.timedelta(minutes=duration_minutes)
+
+    free = []
+    for offset in range(max(1, min(int(days), MAX_SCHEDULE_DAYS))):
+        day = first_day + datetime.timedelta(days=offset)
+        window_start = parse_smart_time(earliest, day) or day.replace(hour=8)
+        window_end = parse_smart_time(latest, day) or day.replace(hour=22)
+        window_start = max(window_start, now.replace(second=0, microsecond=0))
+        slots = event_store.free_slots(window_start, window_end, min_duration) if window_start < window_end else []
+        free.append((day.date(), slots))
+    return free
+
 def update_event(keyword: str, date_str: str = "today", new_start_time: str = None, new_title: str = None):
+    calendar_service = get_calendar_service()
     if not calendar_service: return "Calendar service unavailable."
     try:
+        event_store = get_event_store()
         days_to_search = 7 if date_str.lower() == "today" else 2
         start_iso, end_iso = get_date_range(date_str, days=days_to_search)
 
-        events_result = calendar_service.events().list(
-            calendarId=CALENDAR_ID, timeMin=start_iso, timeMax=end_iso, q=keyword, singleEvents=True
-        ).execute()
-
-        events = events_result.get('items', [])
+        # Fuzzy in-memory lookup first (tolerates misheard titles); the API search only on a miss
+        events = event_store.find(keyword, start_iso, end_iso) or event_store.search_remote(keyword, start_iso, end_iso)
         if not events: return f"Could not find event matching '{keyword}'."
 
         target_event = events[0]
@@ -280,64 +586,271 @@ def update_event(keyword: str, date_str: str = "today", new_start_time: str = No
 
         if not changes: return "No changes were made."
 
-        calendar_service.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body=changes).execute()
+        updated = get_calendar_writer().submit(calendar_service.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body=changes)).result()
+        event_store.upsert(updated)
+        get_response_cache().invalidate()
         return "Event updated successfully."
 
     except Exception as e: return f"Error updating event: {str(e)}"
 
-def delete_events(date_str: str = "today", keyword: str = ""):
-    if not calendar_service: return "Calendar service unavailable."
+def title_matches(title, keyword):
+    """
+    True if `keyword` is a substring of `title`, or every word of it is a whole word of the title.
+    Deliberately not fuzzy: a misheard title must not delete a different event.
+    """
+    title, keyword = (title or "").lower(), keyword.lower()
+    if keyword in title: return True
+    words = set(re.findall(r"\w+", title))
+    return all(word in words for word in re.findall(r"\w+", keyword))
+
+def remove_matching_events(date_str="today", keyword="", item_type=""):
+    """
+    Deletes the day's events whose title matches `keyword` (see title_matches) and whose type is `item_type`
+    (either may be blank). Nothing is deleted on a fuzzy match alone: if no title matches,
+    the closest fuzzy matches come back as candidates so the user can confirm one.
+    Returns (deleted, failed, candidates).
+    """
+    calendar_service = get_calendar_service()
+    event_store = get_event_store()
+    start_iso, end_iso = get_date_range(date_str)
+    matches = lambda e: (not item_type or f"Type: {item_type}" in e.get('description', '')) and \
+                        (not keyword or title_matches(e.get('summary'), keyword))
+
+    targets = [e for e in event_store.between(start_iso, end_iso) if matches(e)]
+    if keyword and not targets:
+        # The API search sees events added since the last sync; its hits must still match the title
+        targets = [e for e in event_store.search_remote(keyword, start_iso, end_iso) if matches(e)]
+    if keyword and not targets:
+        return 0, 0, event_store.find(keyword, start_iso, end_iso)[:3]
+
+    requests = [calendar_service.events().delete(calendarId=CALENDAR_ID, eventId=e['id']) for e in targets]
+    results = get_calendar_writer().run(requests)
+
+    count = 0
+    failed = 0
+    for event, (_, error) in zip(targets, results):
+        if error:
+            failed += 1
+        else:
+            event_store.remove(event['id'])
+            count += 1
+    if count: get_response_cache().invalidate()
+    return count, failed, []
+
+def delete_events(date_str: str = "today", keyword: str = "", item_type: str = ""):
+    if not get_calendar_service(): return "Calendar service unavailable."
     try:
-        start_iso, end_iso = get_date_range(date_str)
-        events_result = calendar_service.events().list(
-            calendarId=CALENDAR_ID, timeMin=start_iso, timeMax=end_iso, singleEvents=True
-        ).execute()
-        events = events_result.get('items', [])
-        
-        count = 0
-        for event in events:
-            title = event.get('summary', '')
-            if not keyword or keyword.lower() in title.lower():
-                calendar_service.events().delete(calendarId=CALENDAR_ID, eventId=event['id']).execute()
-                count += 1
-        
+        if item_type and item_type not in VALID_TYPES: item_type = ""
+        count, failed, candidates = remove_matching_events(date_str, keyword, item_type)
+        if candidates:
+            titles = ", ".join(f"'{e.get('summary', 'Untitled')}'" for e in candidates)
+            return f"Nothing deleted: no event title matches '{keyword}'. Closest matches: {titles}. Ask the user which one they meant."
+        if failed: return f"Deleted {count} event(s). {failed} could not be deleted."
         return f"Deleted {count} event(s)."
     except Exception as e: return f"Error removing: {str(e)}"
 
 def send_notification(message: str):
-    if not email_user or not email_pass: return "Email not configured."
-    try:
-        msg = MIMEText(message)
-        msg['Subject'] = "Receptionist Alert"
-        msg['From'] = email_user
-        msg['To'] = email_user
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as s:
-            s.login(email_user, email_pass)
-            s.send_message(msg)
-        return "Notification sent."
-    except Exception as e: return f"Email failed: {e}"
+    notifier = get_notifier()
+    if not notifier: return "Email not configured."
+    notifier.send(message)
+    return "Notification queued."
 
 # Tool Mapping
-tools_list = [add_to_schedule, check_schedule, list_upcoming_events, update_event, delete_events, send_notification]
+tools_list = [add_to_schedule, check_schedule, find_free_slots, list_upcoming_events, update_event, delete_events, send_notification]
 tool_map = {
     'add_to_schedule': add_to_schedule,
     'check_schedule': check_schedule,
+    'find_free_slots': find_free_slots,
     'list_upcoming_events': list_upcoming_events, 
     'update_event': update_event,
     'delete_events': delete_events,
     'send_notification': send_notification
 }
+# Turns that call any of these have side effects, so their replies are never served from the cache
+MUTATING_TOOLS = {'add_to_schedule', 'update_event', 'delete_events', 'send_notification'}
 
-# --- AI BRAIN ---
-def process_message(user_input, chat_history):
-    if user_input.upper().strip() in ["STOP", "CANCEL", "RESET", "END"]:
-        return "Stopped."
+# Tool calls from one model response are independent, so they run side by side
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+def call_tool(func_name, args):
+    if func_name not in tool_map: return "Function not found."
+    with tracing.span(f"tool.{func_name}", tool=func_name) as span:
+        try:
+            result = tool_map[func_name](**args)
+        except Exception as e:
+            result = f"Error: {str(e)}"
+        span.set(result_chars=len(str(result)), failed=is_tool_error(result))
+        return result
+
+class ToolCall:
+    """
+    One submitted function call. Its timeout counts from when a tool thread picks it up, not from submission.
+    """
+    def __init__(self, function_call):
+        self.name = function_call.name
+        self.timeout = TOOL_TIMEOUTS.get(self.name, DEFAULT_TOOL_TIMEOUT)
+        self.submitted = time.monotonic()
+        self.started = None
+        self.outcome = None # 'done', 'not_run' (withdrawn while queued) or 'timed_out' (may still finish)
+        self.running = threading.Event()
+        self.future = tool_executor.submit(tracing.wrap(self._run), dict(function_call.args))
+
+    def _run(self, args):
+        self.started = time.monotonic()
+        self.running.set()
+        return call_tool(self.name, args)
+
+    def result(self):
+        """
+        The tool's result, or an error saying whether it did not run (safe to retry) or may still finish (not safe).
+        """
+        # Still queued behind other turns' calls after a whole timeout: withdraw it, so it never runs late
+        if not self.running.wait(max(0, self.submitted + self.timeout - time.monotonic())):
+            if self.future.cancel():
+                self.outcome = 'not_run'
+                return f"Error: {self.name} was not run, the tool workers were busy. Nothing was changed."
+            self.running.wait()
+        try:
+            result = self.future.result(timeout=max(0, self.started + self.timeout - time.monotonic()))
+            self.outcome = 'done'
+            return result
+        except FutureTimeoutError:
+            self.future.cancel() # no-op once running: the thread cannot be interrupted
+            self.outcome = 'timed_out'
+            return f"Error: {self.name} timed out after {self.timeout} seconds and may still complete. Check before retrying."
+
+def run_tool_calls(function_calls):
+    """
+    Runs a batch of function calls concurrently. Returns [(name, result)] in call order.
+    """
+    with tracing.span("tools", calls=len(function_calls)) as span:
+        calls = [ToolCall(fc) for fc in function_calls]
+        results = [(call.name, call.result()) for call in calls]
+        span.set(timeouts=sum(1 for call in calls if call.outcome == 'timed_out'),
+                 not_run=sum(1 for call in calls if call.outcome == 'not_run'))
+        return results
+
+def build_function_responses(results):
+    return [
+        {"function_response": {"name": func_name, "response": {"result": result}}}
+        for func_name, result in results
+    ]
+
+# --- LOCAL FAST PATH ---
+fast_path_stats = {
+    'hits': 0,
+    'misses': 0,
+    'fast_seconds': 0.0, # time spent answering hits locally
+    'model_turn_seconds': None, # EWMA of a full Gemini turn, the cost each hit avoided
+    'saved_seconds': 0.0,
+}
+_fast_path_lock = threading.Lock()
+
+def try_fast_path(user_input):
+    """
+    Answers simple schedule commands locally, without a model round trip.
+    Returns voice-ready prose, or None to hand off to Gemini.
+    """
+    intent = intents.parse(user_input, TIMEZONE)
+    tracing.annotate(intent=intent.name if intent else None, intent_confidence=intent.confidence if intent else None)
+    if intent is None or intent.confidence < FAST_PATH_MIN_CONFIDENCE or not get_calendar_service():
+        with _fast_path_lock: fast_path_stats['misses'] += 1
+        return None
+
+    started = time.monotonic()
+    try:
+        if intent.name == "check_schedule" and intent.args.get('days', 1) > 1:
+            start_iso, _ = get_date_range(intent.args['date_str'])
+            reply = intents.describe_days(get_event_store().days(start_iso, intent.args['days']), intent.label)
+        elif intent.name == "check_schedule":
+            start_iso, end_iso = get_date_range(intent.args['date_str'])
+            reply = intents.describe_day(get_event_store().between(start_iso, end_iso), intent.label)
+        elif intent.name == "find_free_slots":
+            free = free_slots_by_day(**intent.args)
+            reply = intents.describe_free(free[0][1], intent.label)
+        elif intent.name == "list_upcoming_events":
+            reply = intents.describe_upcoming(get_event_store().upcoming(intent.args['max_results']))
+        else:
+            count, failed, _ = remove_matching_events(intent.args['date_str'], item_type=intent.args['item_type'])
+            reply = intents.describe_deleted(count, failed, intent.label, intent.args['item_type'])
+    except Exception as e:
+        print(f"Fast path failed, handing off: {e}")
+        with _fast_path_lock: fast_path_stats['misses'] += 1
+        return None
+
+    elapsed = time.monotonic() - started
+    with _fast_path_lock:
+        fast_path_stats['hits'] += 1
+        fast_path_stats['fast_seconds'] += elapsed
+        if fast_path_stats['model_turn_seconds'] is not None:
+            fast_path_stats['saved_seconds'] += max(0.0, fast_path_stats['model_turn_seconds'] - elapsed)
+    return reply
+
+def record_model_turn(seconds):
+    with _fast_path_lock:
+        previous = fast_path_stats['model_turn_seconds']
+        fast_path_stats['model_turn_seconds'] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+def fast_path_report():
+    with _fast_path_lock:
+        stats = dict(fast_path_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+# --- RESPONSE CACHE ---
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
 
-    # --- VOICE OPTIMIZED SYSTEM INSTRUCTION ---
-    system_instruction = f"""
+def history_digest(session, exchanges=RESPONSE_CACHE_CONTEXT):
+    """
+    Digest of the text of the session's last `exchanges` exchanges, time preambles left out.
+    """
+    messages = []
+    for content in session.chat.history:
+        text = " ".join(part.text for part in content.parts if part.text)
+        if text: messages.append(f"{content.role}: {re.sub(TIME_PREAMBLE, '', text)}")
+    return hashlib.sha1("\n".join(messages[-2 * exchanges:]).encode()).hexdigest()
+
+def response_cache_key(user_input, session):
+    """
+    (normalized text, date range it refers to, calendar version, conversation digest), or None if the calendar
+    is unavailable. Only follow-ups ("and the afternoon?") get a digest of the recent conversation, which keeps
+    their answers to the conversation they belong to; self-contained questions share one entry across sessions.
+    """
+    text = intents.normalize(user_input)
+    if not text or not get_calendar_service(): return None
+    try:
+        date_range = get_date_range(intents.find_date(text, TIMEZONE))
+        event_store = get_event_store()
+        event_store.refresh()
+        context = None if intents.self_contained(text, TIMEZONE) else history_digest(session)
+        return text, date_range, event_store.version, context
+    except Exception as e:
+        print(f"Response cache skipped: {e}")
+        return None
+
+def is_tool_error(result):
+    return str(result).startswith(("Error", "Calendar service unavailable"))
+
+# --- STOCK REPLIES ---
+STOPPED_REPLY = "Stopped."
+OFFLINE_REPLY = "I am unable to connect to the neural network."
+
+# Fixed strings the assistant says verbatim; the UI pre-synthesizes their audio at startup
+STOCK_PHRASES = [
+    STOPPED_REPLY, OFFLINE_REPLY,
+    "Event updated successfully.", "No changes were made.", "Email not configured.",
+    "You have nothing scheduled today.", "You have nothing scheduled tomorrow.", "You have no upcoming events.",
+]
+
+# --- AI BRAIN ---
+# --- VOICE OPTIMIZED SYSTEM INSTRUCTION ---
+# Kept byte-stable across turns so the prompt prefix can be reused/cached.
+# The clock goes into a small per-turn preamble instead (see turn_preamble).
+SYSTEM_INSTRUCTION = """
     You are N.A.O.M.I., a highly efficient AI assistant.
     
-    Current Time: {get_current_time()}
+    Each user message starts with the current time in parentheses. Use it for "today", "tomorrow", etc.
     
     CRITICAL OUTPUT RULES FOR TTS (Text-to-Speech):
     1.  **NO MARKDOWN**: Do not use bold (**), italics (*), headers (#), or code blocks.
@@ -351,66 +864,358 @@ def process_message(user_input, chat_history):
     You have access to Google Calendar and Sheets tools. Use them to manage the user's life.
     """
 
-    max_retries = 2
-    attempts = 0
-    response = None
-    
-    while attempts < max_retries:
+_tool_library = None
+
+def get_tool_library():
+    """
+    Function declarations for tools_list, introspected once per process.
+    """
+    global _tool_library
+    if _tool_library is None:
+        import google.generativeai as genai
+        _tool_library = genai.types.FunctionLibrary(tools=tools_list)
+    return _tool_library
+
+def format_history(chat_history):
+    # Convert history to Gemini format
+    history_formatted = []
+    for msg in chat_history:
+        role = "user" if msg["role"] == "user" else "model"
+        history_formatted.append({"role": role, "parts": [msg["content"]]})
+    return history_formatted
+
+def turn_preamble():
+    return f"(Current Time: {get_current_time()})\n"
+
+TIME_PREAMBLE = re.compile(r"^\(Current Time: [^)]*\)\n")
+
+SUMMARY_INSTRUCTION = """
+    Update the running summary of a conversation between a user and their assistant N.A.O.M.I.
+    Keep names, dates, times, tasks and decisions. Drop small talk and anything already done and irrelevant.
+    Reply with the updated summary only, in under 120 words.
+    """
+
+# History compaction (and its summary call) runs between turns, off the request path
+memory_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory")
+
+def usage_attributes(response):
+    usage = getattr(response, 'usage_metadata', None)
+    if not usage: return {}
+    return {'prompt_tokens': usage.prompt_token_count, 'output_tokens': usage.candidates_token_count}
+
+class ChatSession:
+    """
+    One Gemini conversation: the models, the compiled tools and the chat live as long as the session.
+    Each turn sends only the new message, on whichever key the pool says is healthiest,
+    and runs against the session's BackendContext (by default the one current at creation, usually none).
+    """
+    def __init__(self, chat_history=None, pool=None, context=None):
+        self.context = context or _context.get()
+        self.pool = pool or (self.context.pool if self.context else get_key_pool())
+        self._models = {} # (key index, purpose) -> GenerativeModel bound to that key's client
+        self.chat = self._model(None).start_chat(
+            history=format_history(chat_history or []), enable_automatic_function_calling=False
+        )
+        self.memory = ConversationMemory(budget=MEMORY_TOKEN_BUDGET, summarize=self._summarize)
+        self.turn_stats = [] # one dict of token counts per turn
+        self._turn = None
+        self._compaction = None # (history length it was computed from, Future of the compacted history)
+        self._sent_from = [] # the history the last message was sent on top of
+
+    def _model(self, key_state, purpose="chat"):
+        slot = (key_state.index if key_state else None, purpose)
+        if slot not in self._models:
+            import google.generativeai as genai
+            if purpose == "chat":
+                model = genai.GenerativeModel(
+                    model_name=MODEL_NAME, tools=get_tool_library(), system_instruction=SYSTEM_INSTRUCTION
+                )
+            else:
+                model = genai.GenerativeModel(model_name=MODEL_NAME, system_instruction=SUMMARY_INSTRUCTION)
+            if key_state: model._client = self.pool.client(key_state)
+            self._models[slot] = model
+        return self._models[slot]
+
+    def _summarize(self, previous_summary, transcript):
+        prompt = f"Current summary: {previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"
+
+        def attempt(key_state):
+            with tracing.span("model.memory_summary", model=MODEL_NAME, key_index=key_state.index) as span:
+                response = self._model(key_state, "summary").generate_content(prompt)
+                span.set(**usage_attributes(response))
+                return response
+
+        return self.pool.call(tracing.wrap(attempt), attempts=MODEL_ATTEMPTS).text.strip()
+
+    # --- TURN BOOKKEEPING ---
+    def begin_turn(self):
+        """
+        Applies the compaction prepared after the previous turn, then starts counting tokens.
+        """
+        if self._compaction is not None:
+            length, future = self._compaction
+            self._compaction = None
+            try:
+                compacted = future.result()
+                if len(self.chat.history) == length: self.chat.history = compacted
+            except Exception as e:
+                print(f"Memory compaction failed: {e}")
+
+        self._turn = {
+            'history_tokens': estimate_tokens(self.chat.history),
+            'prompt_tokens': 0,
+            'output_tokens': 0,
+            'model_calls': 0,
+            'compaction': self.memory.last_compaction, # estimated tokens before/after the last fold
+            'tools': [], # names of the tools the model called
+            'tool_errors': 0,
+            'restored': False, # the turn was rolled back (model failure, broken stream, step limit)
+        }
+
+    def record_usage(self, response):
+        usage = getattr(response, 'usage_metadata', None)
+        if self._turn is None or usage is None: return
+        self._turn['prompt_tokens'] += usage.prompt_token_count
+        self._turn['output_tokens'] += usage.candidates_token_count
+        self._turn['model_calls'] += 1
+
+    def record_tools(self, results):
+        if self._turn is None: return
+        self._turn['tools'].extend(name for name, _ in results)
+        self._turn['tool_errors'] += sum(1 for _, result in results if is_tool_error(result))
+
+    def cacheable(self):
+        """
+        Whether this turn's reply can be replayed: it read the calendar, changed nothing and finished cleanly.
+        """
+        turn = self._turn
+        if turn is None or not turn['tools'] or turn['tool_errors'] or turn['restored']: return False
+        return not MUTATING_TOOLS.intersection(turn['tools'])
+
+    def add_exchange(self, user_text, reply):
+        """
+        Records a turn answered outside the model so follow-up questions still have its context.
+        """
+        self.chat.history = self.chat.history + [
+            {"role": "user", "parts": [user_text]},
+            {"role": "model", "parts": [reply]},
+        ]
+
+    def end_turn(self):
+        if self._turn is not None:
+            tracing.annotate(
+                history_tokens=self._turn['history_tokens'], prompt_tokens=self._turn['prompt_tokens'],
+                output_tokens=self._turn['output_tokens'], model_calls=self._turn['model_calls'],
+                tools=",".join(self._turn['tools']),
+            )
+            self.turn_stats.append(self._turn)
+            self._turn = None
         try:
-            model = genai.GenerativeModel(model_name=MODEL_NAME, tools=tools_list, system_instruction=system_instruction)
-            
-            # Convert history to Gemini format
-            history_formatted = []
-            for msg in chat_history:
-                role = "user" if msg["role"] == "user" else "model"
-                history_formatted.append({"role": role, "parts": [msg["content"]]})
-            
-            chat = model.start_chat(history=history_formatted, enable_automatic_function_calling=False)
-            response = chat.send_message(user_input)
-            break 
-            
+            history = list(self.chat.history)
+        except Exception as e:
+            print(f"History unavailable for compaction: {e}")
+            return
+        self._compaction = (len(history), memory_executor.submit(self.memory.compact, history))
+
+    def send(self, content, stream=False, stage="model.first_call"):
+        """
+        `stage` names the trace span: model.first_call for the user's message, model.tool_reply for function results.
+        With stream=True the span ends at the first chunk.
+        """
+        history = self._sent_from = self.chat.history
+
+        def attempt(key_state):
+            with tracing.span(stage, model=MODEL_NAME, key_index=key_state.index, stream=stream) as span:
+                # A fresh chat over the shared history, so a hedged duplicate cannot corrupt it
+                chat = self._model(key_state).start_chat(history=history, enable_automatic_function_calling=False)
+                response = chat.send_message(content, stream=stream)
+                span.set(**usage_attributes(response))
+                return chat, response
+
+        self.chat, response = self.pool.call(tracing.wrap(attempt), attempts=MODEL_ATTEMPTS, hedge_after=HEDGE_AFTER or None)
+        return response
+
+    def checkpoint(self):
+        return len(self.chat.history)
+
+    def restore(self, mark):
+        """
+        Drops everything after a checkpoint, e.g. a turn left with unanswered function calls.
+        """
+        if self._turn is not None: self._turn['restored'] = True
+        try:
+            history = self.chat.history
         except Exception:
-            switch_api_key()
-            attempts += 1
-            time.sleep(1)
+            # A broken or unfinished stream leaves an exchange that cannot be replayed
+            history = self._sent_from
+        self.chat.history = history[:mark]
+
+def process_message(user_input, chat_history, session=None):
+    if user_input.upper().strip() in ["STOP", "CANCEL", "RESET", "END"]:
+        return STOPPED_REPLY
+
+    # Callers without a long-lived session get a one-off one seeded from the history
+    if session is None:
+        session = ChatSession(chat_history)
+
+    with activate(session.context), tracing.span("turn", stream=False) as turn:
+        session.begin_turn()
+        try:
+            reply = try_fast_path(user_input)
+            if reply is not None:
+                turn.set(route="fast_path")
+                session.add_exchange(turn_preamble() + user_input, reply)
+                return reply
+
+            cache_key = response_cache_key(user_input, session)
+            reply = get_response_cache().get(cache_key) if cache_key else None
+            if reply is not None:
+                turn.set(route="cache")
+                session.add_exchange(turn_preamble() + user_input, reply)
+                return reply
+
+            turn.set(route="model")
+            started = time.monotonic()
+            reply = _run_turn(user_input, session)
+            record_model_turn(time.monotonic() - started)
+            if cache_key and session.cacheable():
+                get_response_cache().put(cache_key, reply)
+            return reply
+        finally:
+            session.end_turn()
+
+def _run_turn(user_input, session):
+    mark = session.checkpoint()
+    response = None
+    try:
+        response = session.send(turn_preamble() + user_input)
+        session.record_usage(response)
+    except Exception as e:
+        print(f"Model request failed: {e}")
 
     if not response:
-        return "I am unable to connect to the neural network."
+        return OFFLINE_REPLY
+
+    # Function Calling Logic: keep going while the model asks for tools, up to MAX_TOOL_STEPS rounds
+    tool_results = []
+    for step in range(MAX_TOOL_STEPS + 1):
+        function_calls_found = [part.function_call for part in response.parts if part.function_call]
+        if not function_calls_found:
+            return response.text.strip()
+
+        if step < MAX_TOOL_STEPS:
+            step_results = run_tool_calls(function_calls_found)
+            tool_results.extend(step_results)
+            session.record_tools(step_results)
+        else:
+            step_results = [(fc.name, "Not run: tool step limit reached. Answer with what you have.") for fc in function_calls_found]
+
+        # Send results back to AI for the next step or final natural language summary
+        try:
+            response = session.send(build_function_responses(step_results), stage="model.tool_reply")
+            session.record_usage(response)
+        except Exception as e:
+            print(f"Summarization failed: {e}")
+            break
+
+    # If Gemini fails to summarize (or never stops calling tools), WE return the raw data manually.
+    session.restore(mark)
+    return raw_data_reply(tool_results)
+
+def raw_data_reply(tool_results):
+    raw_data = " ".join(str(result) for _, result in tool_results)
+    return f"I checked your calendar. Here is the raw data: {raw_data}"
+
+def stream_message(user_input, chat_history, session=None):
+    """
+    Streaming twin of process_message: yields reply text as Gemini produces it,
+    so speech synthesis can start on the first sentence.
+    """
+    if user_input.upper().strip() in ["STOP", "CANCEL", "RESET", "END"]:
+        yield STOPPED_REPLY
+        return
+
+    if session is None:
+        session = ChatSession(chat_history)
+
+    with activate(session.context), tracing.span("turn", stream=True) as turn:
+        session.begin_turn()
+        try:
+            reply = try_fast_path(user_input)
+            if reply is not None:
+                turn.set(route="fast_path")
+                session.add_exchange(turn_preamble() + user_input, reply)
+                yield reply
+                return
+
+            cache_key = response_cache_key(user_input, session)
+            reply = get_response_cache().get(cache_key) if cache_key else None
+            if reply is not None:
+                turn.set(route="cache")
+                session.add_exchange(turn_preamble() + user_input, reply)
+                yield reply
+                return
+
+            turn.set(route="model")
+            started = time.monotonic()
+            spoken = []
+            for text in _stream_turn(user_input, session):
+                spoken.append(text)
+                yield text
+            record_model_turn(time.monotonic() - started)
+            if cache_key and session.cacheable():
+                get_response_cache().put(cache_key, "".join(spoken))
+        finally:
+            session.end_turn()
+
+def _stream_turn(user_input, session):
+    mark = session.checkpoint()
+    try:
+        response = session.send(turn_preamble() + user_input, stream=True)
+    except Exception as e:
+        print(f"Model request failed: {e}")
+        yield OFFLINE_REPLY
+        return
+
+    tool_results = []
+    spoke = False
+    for step in range(MAX_TOOL_STEPS + 1):
+        function_calls_found = []
+        try:
+            for chunk in response:
+                for part in chunk.parts:
+                    if part.function_call:
+                        function_calls_found.append(part.function_call)
+                    elif part.text:
+                        spoke = True
+                        yield part.text
+        except GeneratorExit:
+            # The listener went away mid-reply: drop the half-told exchange
+            session.restore(mark)
+            raise
+        except Exception as e:
+            print(f"Stream interrupted: {e}")
+            break
+        session.record_usage(response)
+
+        if not function_calls_found:
+            return
+
+        if step < MAX_TOOL_STEPS:
+            step_results = run_tool_calls(function_calls_found)
+            tool_results.extend(step_results)
+            session.record_tools(step_results)
+        else:
+            step_results = [(fc.name, "Not run: tool step limit reached. Answer with what you have.") for fc in function_calls_found]
 
-    # Function Calling Logic
-    function_calls_found = []
-    for part in response.parts:
-        if part.function_call:
-            function_calls_found.append(part.function_call)
-    
-    if function_calls_found:
-        function_responses = []
-        for fc in function_calls_found:
-            func_name = fc.name
-            args = dict(fc.args)
-            
-            if func_name in tool_map:
-                try:
-                    result = tool_map[func_name](**args)
-                except Exception as e:
-                    result = f"Error: {str(e)}"
-            else:
-                result = "Function not found."
-            
-            function_responses.append({
-                "function_response": {
-                    "name": func_name,
-                    "response": {"result": result}
-                }
-            })
-        
-        # Send results back to AI for final natural language summary
         try:
-            final_response = chat.send_message(function_responses)
-            return final_response.text.strip()
+            response = session.send(build_function_responses(step_results), stream=True, stage="model.tool_reply")
         except Exception as e:
-            # If Gemini fails to summarize, WE return the raw data manually.
             print(f"Summarization failed: {e}")
-            return f"I checked your calendar. Here is the raw data: {tool_output}"
+            break
 
-    return response.text.strip()
\ No newline at end of file
+    session.restore(mark)
+    if tool_results:
+        yield raw_data_reply(tool_results)
+    elif not spoke:
+        yield OFFLINE_REPLY
\ No newline at end of file
@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from googleapiclient.errors import HttpError
+
+RETRYABLE_STATUSES = (429, 500, 502, 503)
+RATE_LIMIT_REASONS = (b'rateLimitExceeded', b'userRateLimitExceeded')
+
+
+def is_throttled(exc):
+    """
+    True for errors Google asks us to retry: 429/5xx, and 403 rate-limit responses.
+    """
+    if not isinstance(exc, HttpError): return False
+    status = exc.resp.status
+    if status in RETRYABLE_STATUSES: return True
+    return status == 403 and any(reason in (exc.content or b'') for reason in RATE_LIMIT_REASONS)
+
+
+class BatchWriter:
+    """
+    Coalesces Google API mutations into batch HTTP requests.
+    Requests submitted within `window` seconds of each other (e.g. parallel tool calls in one turn)
+    share one round trip, but each gets its own Future with its own result or error.
+    Throttled items are retried in a later batch with jittered exponential backoff.
+    """
+
+    def __init__(self, new_batch, execute=None, window=0.02, max_batch=50, max_attempts=4, backoff=0.5):
+        self.new_batch = new_batch  # e.g. calendar_service.new_batch_http_request
+        self.execute = execute or (lambda request: request.execute())
+        self.window = window
+        self.max_batch = max_batch  # Calendar recommends at most 50 calls per batch
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        self.round_trips = 0
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, request):
+        future = Future()
+        with self._lock:
+            self._pending.append((request, future))
+            if len(self._pending) >= self.max_batch:
+                items, self._pending = self._pending, []
+                if self._timer: self._timer.cancel()
+                self._timer = None
+                threading.Thread(target=self._run, args=(items,), daemon=True).start()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def run(self, requests):
+        """
+        Submits several requests and waits for all of them. Returns [(response, exception)] in order.
+        """
+        futures = [self.submit(request) for request in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+    # --- INTERNALS ---
+    def _flush(self):
+        with self._lock:
+            items, self._pending = self._pending, []
+            self._timer = None
+        if items: self._run(items)
+
+    def _run(self, items):
+        attempt = 0
+        while items:
+            attempt += 1
+            retry = []
+            for start in range(0, len(items), self.max_batch):
+                retry += self._send(items[start:start + self.max_batch], final=attempt >= self.max_attempts)
+            items = retry
+            if items:
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+    def _send(self, chunk, final):
+        """
+        Sends one chunk and resolves its futures. Returns the throttled items to try again.
+        """
+        retry = []
+
+        def resolve(item, response, exception):
+            request, future = item
+            if exception is None:
+                future.set_result(response)
+            elif is_throttled(exception) and not final:
+                retry.append(item)
+            else:
+                future.set_exception(exception)
+
+        try:
+            self.round_trips += 1
+            # A lone request is cheaper without the multipart envelope
+            if len(chunk) == 1:
+                try:
+                    resolve(chunk[0], self.execute(chunk[0][0]), None)
+                except HttpError as e:
+                    resolve(chunk[0], None, e)
+                return retry
+
+            batch = self.new_batch()
+            for index, item in enumerate(chunk):
+                batch.add(item[0], callback=lambda _, response, exception, item=item: resolve(item, response, exception),
+                          request_id=str(index))
+            self.execute(batch)
+        except Exception as e:
+            # The whole round trip failed (network, auth, malformed batch): every unresolved item gets the error
+            for item in chunk:
+                if not item[1].done() and item not in retry:
+                    item[1].set_exception(e)
+        return retry
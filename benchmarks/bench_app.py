@@ -0,0 +1,111 @@
+"""
+Benchmark: Streamlit script-run wall time per turn, driving app.py through streamlit's AppTest
+with every service replaced by the offline fakes in fakes.py.
+
+Each turn submits a chat message and times the script run(s) it causes, until the reply is in the log,
+i.e. how long a server thread is busy with the turn. Also reports the "command" span (the turn's work)
+and the bytes of every message the turn queues for the browser, and how many of those are stylesheets.
+
+    python benchmarks/bench_app.py [--turns 5] [--app app.py] [--model-latency 0.3] [--tts-latency 0.2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+from streamlit.testing.v1 import AppTest
+
+import backend
+import tracing
+import voice_engine
+from fakes import FakeCalendar, FakeModelClient, FakeSheets, FakeSMTPServer, FakeTTS
+from key_pool import KeyPool
+from notifier import NotificationDispatcher
+
+UTTERANCES = [
+    "What's on my schedule today?",
+    "Tell me a joke",
+    "Before my next class, what do I have going on tomorrow",
+    "What am I doing this week?",
+]
+
+
+def use_fakes(args):
+    smtp = FakeSMTPServer().start()
+    notifier = NotificationDispatcher('naomi@localhost', host=smtp.address[0], port=smtp.address[1], use_ssl=False, window=0.1, min_interval=0)
+    notifier.start()
+    pool = KeyPool(["offline-1"], client_factory=lambda key: FakeModelClient(latency=args.model_latency, chunk_delay=args.chunk_delay))
+    backend.SHEETS_JOURNAL_PATH = os.path.join(tempfile.mkdtemp(), 'journal.db')
+    backend.use_services(calendar=FakeCalendar([], 0.02), sheets=FakeSheets(0.02), pool=pool, notifier=notifier)
+    voice_engine.audio_cache.directory = tempfile.mkdtemp()
+    voice_engine._synthesize = FakeTTS(latency=args.tts_latency, per_char=0.002).stream
+    return smtp
+
+
+class ByteCounter:
+    """
+    Counts the serialized size of every ForwardMsg the app queues for the browser.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.styles = 0
+        ForwardMsgQueue._before_enqueue_msg = self.count
+
+    def count(self, msg):
+        size = msg.ByteSize()
+        self.total += size
+        element = str(msg.delta.new_element) if msg.HasField("delta") else ""
+        if "<style" in element or "naomi-styles" in element: # inline style blocks, or the once-per-session sheet
+            self.styles += size
+
+    def take(self):
+        counts = (self.total, self.styles)
+        self.total = self.styles = 0
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=5)
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'), help="script to drive (e.g. an older copy of app.py)")
+    parser.add_argument('--model-latency', type=float, default=0.3)
+    parser.add_argument('--chunk-delay', type=float, default=0.03)
+    parser.add_argument('--tts-latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    smtp = use_fakes(args)
+    at = AppTest.from_file(os.path.abspath(args.app), default_timeout=120)
+    counter = ByteCounter()
+    at.run()
+    first_total, first_styles = counter.take()
+
+    runs, sent = [], []
+    for i in range(args.turns):
+        utterance = UTTERANCES[i % len(UTTERANCES)]
+        started = time.perf_counter()
+        at.chat_input[0].set_value(utterance).run()
+        runs.append(time.perf_counter() - started)
+        sent.append(counter.take())
+        if at.exception: raise RuntimeError(at.exception[0].message)
+        assert at.session_state.messages[-1]["role"] == "assistant", "turn did not finish"
+
+    commands = [s.duration for s in tracing.tracer.recent if s.name == "command"]
+    print(f"{args.app}: {args.turns} turns")
+    print(f"script run per turn   p50 {statistics.median(runs) * 1000:8.0f} ms   max {max(runs) * 1000:8.0f} ms")
+    if commands:
+        print(f"command span          p50 {statistics.median(commands) * 1000:8.0f} ms   max {max(commands) * 1000:8.0f} ms")
+    print(f"first page load       {first_total / 1024:8.1f} KiB sent, {first_styles / 1024:.1f} KiB of it stylesheets")
+    print(f"sent per turn     p50 {statistics.median(total for total, _ in sent) / 1024:8.1f} KiB, "
+          f"{statistics.median(styles for _, styles in sent) / 1024:.1f} KiB of it stylesheets")
+    smtp.stop()
+
+
+if __name__ == '__main__':
+    main()
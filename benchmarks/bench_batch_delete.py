@@ -0,0 +1,112 @@
+"""
+Benchmark: deleting 50 calendar events one request at a time vs through BatchWriter.
+
+Runs against a local fake Calendar endpoint (no credentials, no network), with an
+artificial per-round-trip latency so the difference resembles a real HTTPS call.
+
+    python benchmarks/bench_batch_delete.py [--events 50] [--latency 0.05]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.http import BatchHttpRequest
+
+from batch_writer import BatchWriter
+
+CALENDAR_ID = 'bench@group.calendar.google.com'
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    round_trips = 0
+
+    def log_message(self, *args): pass
+
+    def _reply(self, status, body=b'', content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_DELETE(self):
+        FakeCalendarHandler.round_trips += 1
+        time.sleep(self.latency)
+        self._reply(204)
+
+    def do_POST(self):
+        FakeCalendarHandler.round_trips += 1
+        time.sleep(self.latency)
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        message = BytesParser().parsebytes(b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+
+        boundary = 'batch_response_boundary'
+        parts = []
+        for part in message.get_payload():
+            content_id = part['Content-ID'].replace('<', '<response-', 1)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                "HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n\r\n"
+            )
+        payload = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self._reply(200, payload, f'multipart/mixed; boundary={boundary}')
+
+
+def start_server(latency):
+    FakeCalendarHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCalendarHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def measure(label, fn):
+    FakeCalendarHandler.round_trips = 0
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<12} round trips: {FakeCalendarHandler.round_trips:>4}   wall time: {elapsed * 1000:8.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every round trip")
+    args = parser.parse_args()
+
+    server, base = start_server(args.latency)
+    service = build('calendar', 'v3', http=httplib2.Http(), static_discovery=True,
+                    client_options={'api_endpoint': base})
+
+    def requests():
+        return [service.events().delete(calendarId=CALENDAR_ID, eventId=f"evt{i}") for i in range(args.events)]
+
+    def sequential():
+        for request in requests():
+            request.execute()
+
+    writer = BatchWriter(lambda: BatchHttpRequest(batch_uri=base + 'batch/calendar/v3'))
+
+    def batched():
+        results = writer.run(requests())
+        errors = [e for _, e in results if e]
+        if errors: raise errors[0]
+
+    print(f"Deleting {args.events} events, {args.latency * 1000:.0f} ms per round trip")
+    before = measure("sequential", sequential)
+    after = measure("batched", batched)
+    print(f"speedup: {before / after:.1f}x")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
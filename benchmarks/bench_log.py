@@ -0,0 +1,84 @@
+"""
+Benchmark: cost of an idle rerun of app.py as the System Log grows, through streamlit's AppTest.
+
+For sessions of 10, 100 and 1000 messages it reports the script-run time of a rerun, the number of
+elements the log sends and their serialized size (the websocket payload of the log).
+The services the app touches at startup (presynthesis, journal replay) run on the fakes in fakes.py,
+so timings do not depend on the network.
+
+    python benchmarks/bench_log.py [--sizes 10 100 1000] [--runs 5] [--app app.py]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+import backend
+import voice_engine
+from fakes import FakeCalendar, FakeModelClient, FakeSheets, FakeTTS
+from key_pool import KeyPool
+
+REPLY = ("Here is your schedule today.\n\n* 9:00 AM: [IEEE] Weekly sync\n* 1:00 PM: [Combat Robotics] Build session\n"
+         "* 4:00 PM: [Fluids Research] Flume calibration")
+
+
+def history(count):
+    return [{"role": "user", "content": f"What's on my schedule today? ({i})"} if i % 2 == 0
+            else {"role": "assistant", "content": f"{REPLY} ({i})"} for i in range(count)]
+
+
+def leaves(node):
+    children = getattr(node, "children", None)
+    if children is None: return [node]
+    return [leaf for child in children.values() for leaf in leaves(child)]
+
+
+def log_elements(root):
+    # The System Log is the fixed-height container: every element inside it
+    def find(node):
+        if getattr(node, "type", None) == "flex_container" and node.proto is not None and node.proto.height_config.pixel_height:
+            return node
+        for child in getattr(node, "children", {}).values():
+            found = find(child)
+            if found: return found
+    return leaves(find(root))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'), help="script to drive (e.g. an older copy of app.py)")
+    args = parser.parse_args()
+
+    backend.SHEETS_JOURNAL_PATH = os.path.join(tempfile.mkdtemp(), 'journal.db')
+    backend.use_services(calendar=FakeCalendar(), sheets=FakeSheets(), pool=KeyPool(["offline"], client_factory=lambda key: FakeModelClient()))
+    voice_engine.audio_cache.directory = tempfile.mkdtemp()
+    voice_engine._synthesize = FakeTTS().stream
+
+    print(f"{'messages':>8} {'rerun p50 ms':>13} {'log elements':>13} {'log payload KiB':>16}")
+    for size in args.sizes:
+        at = AppTest.from_file(os.path.abspath(args.app), default_timeout=60)
+        at.session_state.messages = history(size)
+        at.run()
+        times = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - started)
+        if at.exception: raise RuntimeError(at.exception[0].message)
+
+        log = log_elements(at.main)
+        payload = sum(element.proto.ByteSize() for element in log)
+        print(f"{size:8d} {statistics.median(times) * 1000:13.1f} {len(log):13d} {payload / 1024:16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: a burst of notifications sent one connection per message (the old send_notification)
+vs through NotificationDispatcher (queued, one warm connection, coalesced into a digest).
+
+Runs against fakes.FakeSMTPServer on an ephemeral localhost port, so no mail leaves the machine.
+
+    python benchmarks/bench_notifier.py [--messages 20] [--window 0.5]
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FakeSMTPServer
+from notifier import NotificationDispatcher
+
+SENDER = 'naomi@localhost'
+
+
+def send_directly(host, port, messages):
+    # One connection per message, the way send_notification used to work
+    started = time.perf_counter()
+    worst = 0.0
+    for message in messages:
+        call_started = time.perf_counter()
+        msg = MIMEText(message)
+        msg['Subject'] = "Receptionist Alert"
+        msg['From'] = SENDER
+        msg['To'] = SENDER
+        with smtplib.SMTP(host, port) as s:
+            s.send_message(msg)
+        worst = max(worst, time.perf_counter() - call_started)
+    return time.perf_counter() - started, worst
+
+
+def send_dispatched(host, port, messages, window):
+    dispatcher = NotificationDispatcher(SENDER, host=host, port=port, use_ssl=False, window=window, min_interval=0)
+    dispatcher.start()
+    started = time.perf_counter()
+    worst = 0.0
+    for message in messages:
+        call_started = time.perf_counter()
+        dispatcher.send(message)
+        worst = max(worst, time.perf_counter() - call_started)
+    enqueue_time = time.perf_counter() - started
+    while dispatcher.pending():
+        time.sleep(0.01)
+    dispatcher.close()
+    return enqueue_time, worst, time.perf_counter() - started, dispatcher.stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--window', type=float, default=0.5)
+    args = parser.parse_args()
+    messages = [f"Reminder {i}: check the LRE test stand." for i in range(args.messages)]
+
+    smtp = FakeSMTPServer().start()
+    host, port = smtp.address
+    try:
+        total, worst = send_directly(host, port, messages)
+        print(f"direct:     {len(smtp.messages):3d} emails, {smtp.connections} connections, "
+              f"{total * 1000:7.1f} ms total, worst tool call {worst * 1000:6.1f} ms")
+
+        smtp.messages.clear()
+        smtp.connections = 0
+        enqueue_time, worst, delivered, _ = send_dispatched(host, port, messages, args.window)
+        print(f"dispatched: {len(smtp.messages):3d} emails, {smtp.connections} connections, "
+              f"{enqueue_time * 1000:7.1f} ms in tool calls, worst tool call {worst * 1000:6.3f} ms, "
+              f"delivered after {delivered * 1000:.0f} ms")
+    finally:
+        smtp.stop()
+
+
+if __name__ == '__main__':
+    main()
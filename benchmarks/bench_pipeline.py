@@ -0,0 +1,124 @@
+"""
+Benchmark: end-to-end turns through process_message (text) and stream_message + TTS (voice),
+entirely on the offline fakes in fakes.py, with configurable latency and failure injection.
+
+Reports p50/p95/p99 per stage (model, calendar, sheets, smtp, tts) and per turn, plus turns/sec.
+
+    python benchmarks/bench_pipeline.py [--turns 40] [--voice] [--model-latency 0.3] [--error-rate 0.05]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+
+import backend
+import voice_engine
+from fakes import FakeCalendar, FakeModelClient, FakeSheets, FakeSMTPServer, FakeTTS, Timings
+from key_pool import KeyPool
+from notifier import NotificationDispatcher
+
+# A morning's worth of requests: fast-path reads, model-routed reads, writes, a notification and small talk
+UTTERANCES = [
+    "What's on my schedule today?",
+    "Before my next class, what do I have going on tomorrow",
+    "Tell me a joke",
+    "Before my next class, what do I have going on tomorrow",
+    "Add lab report due tomorrow at 7 pm",
+    "Move the lab report to 8 pm",
+    "Email me that the lab report moved",
+    "Clear tomorrow's to-dos",
+]
+CATEGORIES = ["IEEE", "Combat Robotics", "Rocket Propulsion", "Fluids Research", "LRE Project", "General"]
+DEGRADED = ("I am unable", "I checked your calendar. Here is the raw data")
+
+
+def seed_events(count):
+    tz = pytz.timezone(backend.TIMEZONE)
+    today = datetime.datetime.now(tz).replace(hour=8, minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(count):
+        start = today + datetime.timedelta(days=i % 28 - 14, hours=(i * 3) % 10)
+        events.append({
+            'summary': f"[{CATEGORIES[i % len(CATEGORIES)]}] Session {i}",
+            'description': f"Type: {'Meeting' if i % 3 else 'To-Do Item'}\nNotes: ",
+            'start': {'dateTime': start.isoformat()}, 'end': {'dateTime': (start + datetime.timedelta(hours=1)).isoformat()},
+        })
+    return events
+
+
+def ms(seconds):
+    return f"{seconds * 1000:8.1f}" if seconds is not None else "       -"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--voice', action='store_true', help="drive stream_message + TTS instead of process_message")
+    parser.add_argument('--events', type=int, default=200, help="events seeded into the fake calendar")
+    parser.add_argument('--model-latency', type=float, default=0.3)
+    parser.add_argument('--chunk-delay', type=float, default=0.03)
+    parser.add_argument('--calendar-latency', type=float, default=0.05)
+    parser.add_argument('--sheets-latency', type=float, default=0.05)
+    parser.add_argument('--tts-latency', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="failure rate for model, calendar and sheets calls")
+    parser.add_argument('--no-cache', action='store_true', help="disable the response cache")
+    parser.add_argument('--verbose', action='store_true', help="print each exchange")
+    args = parser.parse_args()
+
+    timings = Timings()
+    smtp = FakeSMTPServer(timings=timings).start()
+    notifier = NotificationDispatcher(
+        'naomi@localhost', host=smtp.address[0], port=smtp.address[1], use_ssl=False, window=0.1, min_interval=0
+    )
+    notifier.start()
+    pool = KeyPool(["offline-1", "offline-2"], client_factory=lambda key: FakeModelClient(
+        latency=args.model_latency, error_rate=args.error_rate, chunk_delay=args.chunk_delay, timings=timings
+    ))
+
+    backend.SHEETS_JOURNAL_PATH = os.path.join(tempfile.mkdtemp(), 'journal.db')
+    backend.SHEETS_FLUSH_INTERVAL = 0.2
+    backend.use_services(
+        calendar=FakeCalendar(seed_events(args.events), args.calendar_latency, args.error_rate, timings),
+        sheets=FakeSheets(args.sheets_latency, args.error_rate, timings),
+        pool=pool, notifier=notifier,
+    )
+    if args.no_cache: backend.response_cache.max_entries = 0
+    voice_engine.audio_cache.directory = tempfile.mkdtemp()  # start cold, and keep fake audio out of the real cache
+    voice_engine._synthesize = FakeTTS(latency=args.tts_latency, per_char=0.002, timings=timings).stream
+
+    session = backend.ChatSession(pool=pool)
+    degraded = 0
+    started = time.perf_counter()
+    for i in range(args.turns):
+        utterance = UTTERANCES[i % len(UTTERANCES)]
+        turn_started = time.perf_counter()
+        if args.voice:
+            stats = {}
+            reply = " ".join(sentence for sentence, _ in
+                             voice_engine.stream_audio_response(backend.stream_message(utterance, [], session), stats))
+            if 'time_to_first_audio' in stats: timings.record('first_audio', stats['time_to_first_audio'])
+        else:
+            reply = backend.process_message(utterance, [], session)
+        timings.record('turn', time.perf_counter() - turn_started)
+        degraded += reply.startswith(DEGRADED)
+        if args.verbose: print(f"> {utterance}\n< {reply}")
+    elapsed = time.perf_counter() - started
+
+    print(f"{'stage':<12} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage, row in sorted(timings.summary().items()):
+        print(f"{stage:<12} {row['count']:6d} {ms(row['p50'])} {ms(row['p95'])} {ms(row['p99'])}")
+    print(f"\n{args.turns} {'voice' if args.voice else 'text'} turns in {elapsed:.2f} s = {args.turns / elapsed:.2f} turns/sec, "
+          f"{degraded} degraded")
+    print(f"fast path hit rate {backend.fast_path_report()['hit_rate']:.0%}, "
+          f"response cache hit rate {backend.response_cache.report()['hit_rate']:.0%}")
+    smtp.stop()
+
+
+if __name__ == '__main__':
+    main()
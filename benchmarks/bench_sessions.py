@@ -0,0 +1,122 @@
+"""
+Load test: N concurrent sessions, each with its own BackendContext (its own fake calendar, sheet,
+journal and response cache) over one shared key pool, tool pool and HTTP transport pool.
+
+Every session's events and utterances carry its own marker ("sess<n>"). After the run, any reply,
+calendar event or sheet row carrying another session's marker counts as cross-talk.
+Reports turns/sec and turn latency for each N, so scaling shows up as throughput growing with N.
+
+    python benchmarks/bench_sessions.py [--sessions 1 2 4 8 16] [--turns 6] [--model-latency 0.3]
+"""
+import argparse
+import datetime
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+
+import backend
+from fakes import FakeCalendar, FakeModelClient, FakeSheets, Timings
+from http_pool import HttpPool
+from key_pool import KeyPool
+
+MARKER = re.compile(r"\bsess(\d+)\b", re.IGNORECASE)
+
+
+def utterances(n):
+    return [
+        "What's on my schedule today?",
+        "Before my next class, what do I have going on tomorrow",
+        f"Add Sess{n} review tomorrow at 7 pm",
+        "What's on my schedule tomorrow?",
+        f"Add Sess{n} lab prep tomorrow at 9 pm",
+        "Tell me a joke",
+    ]
+
+
+def seed_events(n, count=12):
+    tz = pytz.timezone(backend.TIMEZONE)
+    today = datetime.datetime.now(tz).replace(hour=8, minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(count):
+        start = today + datetime.timedelta(days=i % 3, hours=i % 8)
+        events.append({
+            'summary': f"[General] Sess{n} standup {i}", 'description': "Type: Meeting\nNotes: ",
+            'start': {'dateTime': start.isoformat()}, 'end': {'dateTime': (start + datetime.timedelta(minutes=30)).isoformat()},
+        })
+    return events
+
+
+def foreign_markers(n, text):
+    return sum(1 for marker in MARKER.findall(str(text)) if int(marker) != n)
+
+
+def run(sessions, turns, args, pool, http_pool):
+    contexts = [
+        backend.BackendContext(
+            calendar=FakeCalendar(seed_events(n), args.calendar_latency), sheets=FakeSheets(args.sheets_latency),
+            pool=pool, http_pool=http_pool, journal_path=os.path.join(tempfile.mkdtemp(), "journal.db"),
+        )
+        for n in range(sessions)
+    ]
+    timings = Timings()
+    replies = [[] for _ in range(sessions)]
+
+    def session(n):
+        chat = backend.ChatSession(context=contexts[n])
+        script = utterances(n)
+        for i in range(turns):
+            started = time.perf_counter()
+            replies[n].append(backend.process_message(script[i % len(script)], [], chat))
+            timings.record('turn', time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    started = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    elapsed = time.perf_counter() - started
+
+    for context in contexts:
+        journal = context.sheets_journal()
+        if journal: journal.flush()
+    crosstalk = 0
+    for n, context in enumerate(contexts):
+        crosstalk += sum(foreign_markers(n, reply) for reply in replies[n])
+        crosstalk += sum(foreign_markers(n, event.get('summary')) for event in context.calendar_service._events.values())
+        crosstalk += sum(foreign_markers(n, row) for row in context.sheets_service.rows)
+    added = sum(len(context.sheets_service.rows) for context in contexts)
+
+    turn = timings.summary()['turn']
+    print(f"{sessions:8d} {sessions * turns / elapsed:10.2f} {turn['p50'] * 1000:9.0f} {turn['p95'] * 1000:9.0f} "
+          f"{added:10d} {crosstalk:10d}")
+    return crosstalk
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--turns', type=int, default=6, help="turns per session")
+    parser.add_argument('--keys', type=int, default=4, help="API keys in the shared pool")
+    parser.add_argument('--model-latency', type=float, default=0.3)
+    parser.add_argument('--calendar-latency', type=float, default=0.05)
+    parser.add_argument('--sheets-latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    backend.SHEETS_FLUSH_INTERVAL = 0.2
+    pool = KeyPool([f"offline-{i}" for i in range(args.keys)], client_factory=lambda key: FakeModelClient(latency=args.model_latency))
+    http_pool = HttpPool(object, size=backend.HTTP_POOL_SIZE)  # the fakes ignore the transport; this exercises checkout/return
+
+    print(f"{'sessions':>8} {'turns/sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'sheet rows':>10} {'crosstalk':>10}")
+    crosstalk = sum(run(n, args.turns, args, pool, http_pool) for n in args.sessions)
+    print(f"\nhttp pool: {http_pool.report()}")
+    if crosstalk: sys.exit(f"{crosstalk} cross-talk incidents")
+
+
+if __name__ == '__main__':
+    main()
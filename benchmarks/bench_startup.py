@@ -0,0 +1,77 @@
+"""
+Benchmark: how long `import backend` takes, and how long until every client is ready.
+
+Each measurement runs in a fresh interpreter. Socket connects are counted during the
+import to confirm that importing backend does no network I/O.
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, socket, sys, time
+sys.path.insert(0, ROOT)
+
+connects = []
+_connect = socket.socket.connect
+def counting_connect(self, address):
+    connects.append(address)
+    return _connect(self, address)
+socket.socket.connect = counting_connect
+
+started = time.perf_counter()
+import backend
+imported = time.perf_counter()
+import_connects = len(connects)
+
+# Without real credentials, build the clients with anonymous ones so the timing still covers them
+backend.ensure_auth()
+if backend.creds is None:
+    from google.auth.credentials import AnonymousCredentials
+    backend.creds = AnonymousCredentials()
+backend.warm_up()
+ready = time.perf_counter()
+
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'ready_ms': (ready - started) * 1000,
+    'import_connects': import_connects,
+    'ready_connects': len(connects),
+}))
+"""
+
+
+def run_once(journal_path):
+    env = dict(os.environ, SHEETS_JOURNAL_PATH=journal_path, PYTHONWARNINGS="ignore")
+    out = subprocess.run(
+        [sys.executable, "-c", f"ROOT = {ROOT!r}\n" + PROBE],
+        capture_output=True, text=True, env=env, cwd=ROOT, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [run_once(os.path.join(tmp, "journal.db")) for _ in range(args.runs)]
+
+    for field in ('import_ms', 'ready_ms'):
+        values = [r[field] for r in results]
+        print(f"{field:<10} median {statistics.median(values):8.1f}   min {min(values):8.1f}   max {max(values):8.1f}")
+    print(f"socket connects during import: {max(r['import_connects'] for r in results)}")
+    print(f"socket connects until ready:   {max(r['ready_connects'] for r in results)}")
+
+
+if __name__ == '__main__':
+    main()
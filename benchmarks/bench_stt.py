@@ -0,0 +1,94 @@
+"""
+Benchmark: what transcribe_audio uploads before and after silence trimming and downsampling.
+
+Uses a synthetic browser recording (48 kHz mono: room noise, a few seconds of speech-like tone bursts,
+trailing room noise) or a real WAV via --wav. For the raw recording and for prepare_audio()'s output it
+reports the PCM size, the FLAC payload recognize_google actually uploads, the time to prepare and
+encode, and the upload time at --uplink kbit/s. --live also times recognize_google on both (needs network).
+
+    python benchmarks/bench_stt.py [--wav recording.wav] [--uplink 2000] [--live]
+"""
+import argparse
+import io
+import math
+import os
+import random
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+import voice_engine
+
+
+def synthetic_recording(rate=48000, lead=1.5, speech=3.0, tail=2.0):
+    random.seed(7)
+    samples = []
+    for i in range(int(rate * (lead + speech + tail))):
+        t = i / rate
+        value = random.gauss(0, 60)  # room noise
+        if lead <= t < lead + speech:
+            syllable = max(0.0, math.sin(math.pi * (t - lead) * 4))  # ~4 syllables a second
+            value += 6000 * syllable * (math.sin(2 * math.pi * 180 * t) + 0.5 * math.sin(2 * math.pi * 720 * t))
+        samples.append(max(-32768, min(32767, int(value))))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buffer.getvalue()
+
+
+def describe(label, audio_data, prepare_time, uplink, live):
+    started = time.perf_counter()
+    flac = audio_data.get_flac_data(convert_rate=None if audio_data.sample_rate >= 8000 else 8000, convert_width=2)
+    encode_time = time.perf_counter() - started
+    seconds = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+    line = (f"{label:<10} {audio_data.sample_rate:>6} Hz {seconds:6.2f} s   pcm {len(audio_data.frame_data) / 1024:8.1f} KiB"
+            f"   flac upload {len(flac) / 1024:7.1f} KiB   prepare {prepare_time * 1000:6.1f} ms   encode {encode_time * 1000:6.1f} ms"
+            f"   upload @{uplink} kbit/s {len(flac) * 8 / uplink:7.0f} ms")
+    if live:
+        started = time.perf_counter()
+        try:
+            sr.Recognizer().recognize_google(audio_data)
+        except sr.UnknownValueError:
+            pass
+        except sr.RequestError as e:
+            print(f"recognize_google failed: {e}")
+        line += f"   recognize {(time.perf_counter() - started) * 1000:7.0f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wav", help="a real recording to use instead of the synthetic one")
+    parser.add_argument("--uplink", type=int, default=2000, help="uplink bandwidth in kbit/s for the upload estimate")
+    parser.add_argument("--live", action="store_true", help="also time recognize_google (needs network)")
+    args = parser.parse_args()
+
+    if args.wav:
+        with open(args.wav, "rb") as f: recording = f.read()
+    else:
+        recording = synthetic_recording()
+
+    with sr.AudioFile(io.BytesIO(recording)) as source:
+        original = sr.Recognizer().record(source)
+
+    started = time.perf_counter()
+    prepared = voice_engine.prepare_audio(original)
+    prepare_time = time.perf_counter() - started
+    if prepared is None:
+        print("no speech detected")
+        return
+
+    describe("original", original, 0.0, args.uplink, args.live)
+    describe("prepared", prepared, prepare_time, args.uplink, args.live)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: the voice engine's persistent event loop against the old asyncio.run-per-utterance path,
+on fakes.FakeTTS so only loop overhead and scheduling are measured.
+
+1. Per-call overhead: synthesizing with zero TTS latency, asyncio.run() per call vs submitting to the loop.
+2. Concurrent sessions: N threads (one per Streamlit session) each speak M utterances at once;
+   reports wall time, per-utterance p50/p95 and time to first chunk.
+3. One streamed reply of several sentences: sequential synthesis vs the pipelined stream_audio_response.
+
+    python benchmarks/bench_tts_loop.py [--sessions 8] [--utterances 5] [--tts-latency 0.2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voice_engine
+from fakes import FakeTTS
+
+REPLY = ("You have three things today. At nine you have the IEEE weekly sync. "
+         "At one you have the combat robotics build session. At four you have fluids research. "
+         "Tonight the lab report is due at seven. Good luck with it.")
+
+
+def ms(seconds):
+    return f"{seconds * 1000:8.2f}"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def collect(text):
+    return b"".join([chunk async for chunk in voice_engine._synthesize(text)])
+
+
+def old_audio_response(text):
+    # What get_audio_response did before: a fresh event loop for every utterance
+    return asyncio.run(collect(text))
+
+
+def per_call_overhead(calls):
+    voice_engine._synthesize = FakeTTS(latency=0.0).stream
+    voice_engine.get_loop()
+
+    started = time.perf_counter()
+    for i in range(calls): old_audio_response(f"overhead {i}")
+    old = (time.perf_counter() - started) / calls
+
+    started = time.perf_counter()
+    for i in range(calls): voice_engine.submit(collect(f"overhead {i}")).result()
+    new = (time.perf_counter() - started) / calls
+
+    print(f"per-call overhead over {calls} calls (ms): asyncio.run {ms(old)}   persistent loop {ms(new)}")
+
+
+def concurrent_sessions(sessions, utterances, label, speak):
+    latencies, first_chunks = [], []
+    lock = threading.Lock()
+
+    def session(n):
+        for i in range(utterances):
+            started = time.perf_counter()
+            first = speak(f"session {n} utterance {i} from run {label}")
+            done = time.perf_counter()
+            with lock:
+                latencies.append(done - started)
+                first_chunks.append(first - started)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    started = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    wall = time.perf_counter() - started
+    print(f"  {label:<16} wall {ms(wall)}   utterance p50 {ms(percentile(latencies, 50))} p95 {ms(percentile(latencies, 95))}"
+          f"   first chunk p50 {ms(percentile(first_chunks, 50))} p95 {ms(percentile(first_chunks, 95))}")
+
+
+def speak_old(text):
+    old_audio_response(text)
+    return time.perf_counter()  # the whole utterance is buffered, so the first chunk arrives with the last
+
+
+def speak_new(text):
+    first = None
+    for _ in voice_engine.iter_audio_chunks(text):
+        if first is None: first = time.perf_counter()
+    return first
+
+
+def streamed_reply(latency):
+    voice_engine._synthesize = FakeTTS(latency=latency, per_char=0.002).stream
+    sentences = list(voice_engine.split_sentences([REPLY]))
+
+    started = time.perf_counter()
+    for sentence in sentences: old_audio_response(f"{sentence} (sequential)")
+    sequential = time.perf_counter() - started
+
+    stats = {}
+    words = iter(f"{word} " for word in f"{REPLY} (pipelined)".split(" "))
+    for _ in voice_engine.stream_audio_response(words, stats=stats): pass
+
+    print(f"streamed reply, {len(sentences)} sentences (ms): sequential {ms(sequential)}   "
+          f"pipelined {ms(stats['total_time'])} (first audio {ms(stats['time_to_first_audio'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--utterances", type=int, default=5)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--tts-concurrency", type=int, default=voice_engine.TTS_CONCURRENCY)
+    args = parser.parse_args()
+
+    voice_engine.TTS_CONCURRENCY = args.tts_concurrency
+    voice_engine._slots = asyncio.Semaphore(args.tts_concurrency)
+
+    voice_engine.audio_cache.directory = tempfile.mkdtemp()  # every utterance is unique, but keep fake audio out of the real cache
+
+    per_call_overhead(args.calls)
+
+    print(f"{args.sessions} concurrent sessions x {args.utterances} utterances, {args.tts_latency * 1000:.0f} ms TTS latency "
+          f"(TTS_CONCURRENCY={voice_engine.TTS_CONCURRENCY}), in ms:")
+    voice_engine._synthesize = FakeTTS(latency=args.tts_latency, per_char=0.002).stream
+    concurrent_sessions(args.sessions, args.utterances, "asyncio.run", speak_old)
+    concurrent_sessions(args.sessions, args.utterances, "persistent loop", speak_new)
+
+    streamed_reply(args.tts_latency)
+
+
+if __name__ == "__main__":
+    main()
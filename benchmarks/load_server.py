@@ -0,0 +1,151 @@
+"""
+Load generator for server.py: N concurrent clients, each with its own session, send turns back to back
+for --duration seconds per level, over HTTP (POST /turn) or WebSocket (/voice, a short WAV per turn).
+
+By default it starts the server in-process on the offline fakes in fakes.py; --url targets a running one instead.
+For each client count it reports sustained turns/sec (completed turns over the wall time), turn latency,
+time to the first audio (voice), and turns turned away with 503 / "busy" by admission control.
+
+    python benchmarks/load_server.py [--mode text|voice] [--clients 1 4 16 64] [--duration 10]
+                                     [--max-in-flight 16] [--max-queued 64] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+
+from bench_stt import synthetic_recording
+
+UTTERANCES = [
+    "What's on my schedule today?",
+    "Tell me a joke",
+    "Before my next class, what do I have going on tomorrow",
+    "What am I doing this week?",
+]
+
+
+def start_server(args):
+    import uvicorn
+
+    import backend
+    import server
+    import voice_engine
+    from fakes import FakeCalendar, FakeModelClient, FakeRecognizer, FakeSheets, FakeTTS
+    from key_pool import KeyPool
+
+    pool = KeyPool([f"offline-{i}" for i in range(args.keys)], client_factory=lambda key: FakeModelClient(latency=args.model_latency))
+    backend.SHEETS_JOURNAL_PATH = os.path.join(tempfile.mkdtemp(), 'journal.db')
+    backend.use_services(calendar=FakeCalendar([], 0.02), sheets=FakeSheets(0.02), pool=pool)
+    voice_engine.audio_cache.directory = tempfile.mkdtemp()
+    voice_engine._synthesize = FakeTTS(latency=args.tts_latency, per_char=0.002).stream
+    voice_engine.sr.Recognizer.recognize_google = FakeRecognizer(UTTERANCES, latency=args.stt_latency).recognize_google
+    server.MAX_IN_FLIGHT, server.MAX_QUEUED = args.max_in_flight, args.max_queued
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    instance = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=instance.run, daemon=True).start()
+    while not instance.started: time.sleep(0.05)
+    return instance, f"http://127.0.0.1:{port}"
+
+
+async def text_client(http, url, deadline, results):
+    session = uuid.uuid4().hex
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        async with http.post(f"{url}/turn", json={"text": UTTERANCES[i % len(UTTERANCES)], "session": session}) as response:
+            body = await response.json()
+        if response.status == 503:
+            results['rejected'] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        if response.status != 200: raise RuntimeError(f"{response.status}: {body}")
+        results['turns'].append(time.perf_counter() - started)
+        i += 1
+
+
+async def voice_client(http, url, deadline, results, recording):
+    async with http.ws_connect(f"{url.replace('http', 'ws', 1)}/voice?session={uuid.uuid4().hex}") as ws:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            first_audio = None
+            await ws.send_bytes(recording)
+            while True:
+                message = await ws.receive()
+                if message.type == aiohttp.WSMsgType.BINARY:
+                    if first_audio is None: first_audio = time.perf_counter() - started
+                    continue
+                if message.type != aiohttp.WSMsgType.TEXT: raise RuntimeError(f"socket closed: {message}")
+                event = message.json()
+                if event["type"] in ("done", "busy"): break
+            if event["type"] == "busy":
+                results['rejected'] += 1
+                await asyncio.sleep(event.get("retry_after", 1))
+                continue
+            results['turns'].append(time.perf_counter() - started)
+            if first_audio is not None: results['first_audio'].append(first_audio)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))] if values else float('nan')
+
+
+async def run(clients, args, url, recording):
+    results = {'turns': [], 'first_audio': [], 'rejected': 0}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as http:
+        if args.mode == "voice":
+            await asyncio.gather(*(voice_client(http, url, deadline, results, recording) for _ in range(clients)))
+        else:
+            await asyncio.gather(*(text_client(http, url, deadline, results) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    turns = results['turns']
+    first_audio = statistics.median(results['first_audio']) * 1000 if results['first_audio'] else float('nan')
+    print(f"{clients:8d} {len(turns) / elapsed:10.2f} {percentile(turns, 50) * 1000:9.0f} {percentile(turns, 95) * 1000:9.0f} "
+          f"{first_audio:15.0f} {results['rejected']:9d}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=["text", "voice"], default="text")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--duration', type=float, default=10, help="seconds per client count")
+    parser.add_argument('--url', help="a running server; by default one is started in-process on the fakes")
+    parser.add_argument('--max-in-flight', type=int, default=16)
+    parser.add_argument('--max-queued', type=int, default=64)
+    parser.add_argument('--keys', type=int, default=4, help="API keys in the fake pool")
+    parser.add_argument('--model-latency', type=float, default=0.3)
+    parser.add_argument('--stt-latency', type=float, default=0.3)
+    parser.add_argument('--tts-latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    instance, url = (None, args.url.rstrip('/')) if args.url else start_server(args)
+    recording = synthetic_recording(rate=16000, lead=0.3, speech=1.5, tail=0.3)
+
+    print(f"{args.mode} turns against {url}")
+    print(f"{'clients':>8} {'turns/sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'first audio ms':>15} {'rejected':>9}")
+    for clients in args.clients:
+        await run(clients, args, url, recording)
+
+    async with aiohttp.ClientSession() as http, http.get(f"{url}/health") as response:
+        print(f"\nserver: {await response.json()}")
+    if instance: instance.should_exit = True
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,262 @@
+import datetime
+import threading
+import time
+
+import pytz
+from googleapiclient.errors import HttpError
+
+from interval_index import IntervalIndex
+import tracing
+from title_index import TitleIndex
+
+# Partial responses: only what the store and the tools read, instead of the full event resources
+LIST_FIELDS = "items(id,status,summary,description,start,end),nextPageToken,nextSyncToken"
+
+
+class EventStore:
+    """
+    In-process mirror of one Google Calendar.
+    Seeded with a full listing once, then kept current with syncToken incremental syncs.
+    """
+
+    def __init__(self, service, calendar_id, timezone, max_age=60.0, execute=None):
+        self.service = service
+        self.execute = execute or (lambda request: request.execute())
+        self.calendar_id = calendar_id
+        self.tz = pytz.timezone(timezone)
+        self.max_age = max_age  # seconds a snapshot may be served before re-syncing
+
+        self._events = {}  # event id -> (start_dt, end_dt, event)
+        self.version = 0  # bumped whenever the mirrored data changes; lets callers key caches on it
+        self._titles = TitleIndex()  # fuzzy lookup by title/category, kept in step with _events
+        self._intervals = IntervalIndex()  # overlap queries by time, kept in step with _events
+        self._sync_token = None
+        self._last_sync = None
+        self._lock = threading.RLock()
+
+    # --- SYNC ---
+    def _list_pages(self, **params):
+        """
+        Yields every page of events().list, following nextPageToken.
+        """
+        page_token = None
+        while True:
+            result = self.execute(self.service.events().list(
+                calendarId=self.calendar_id, singleEvents=True, pageToken=page_token, fields=LIST_FIELDS, **params
+            ))
+            yield result
+            page_token = result.get('nextPageToken')
+            if not page_token: return
+
+    def _full_sync(self):
+        events = {}
+        sync_token = None
+        for page in self._list_pages(maxResults=2500):
+            for item in page.get('items', []):
+                if item.get('status') != 'cancelled':
+                    events[item['id']] = self._entry(item)
+            sync_token = page.get('nextSyncToken', sync_token)
+        if events != self._events: self.version += 1
+        self._events = {}
+        self._titles.clear()
+        self._intervals.clear()
+        for event_id, entry in events.items():
+            self._put(event_id, entry)
+        self._sync_token = sync_token
+
+    def _incremental_sync(self):
+        sync_token = self._sync_token
+        changed = False
+        for page in self._list_pages(syncToken=self._sync_token):
+            for item in page.get('items', []):
+                self._apply(item)
+                changed = True
+            sync_token = page.get('nextSyncToken', sync_token)
+        self._sync_token = sync_token
+        if changed: self.version += 1
+
+    def refresh(self, force=False):
+        """
+        Brings the store up to date if it is older than max_age (or if forced).
+        """
+        with self._lock:
+            if not force and self._last_sync is not None and time.monotonic() - self._last_sync < self.max_age:
+                return
+
+            with tracing.span("calendar.sync", incremental=bool(self._sync_token)) as sync:
+                if self._sync_token:
+                    try:
+                        self._incremental_sync()
+                    except HttpError as e:
+                        # 410 Gone: the token expired, start over with a full listing
+                        if e.resp.status != 410: raise
+                        self._sync_token = None
+
+                if not self._sync_token:
+                    self._full_sync()
+                sync.set(events=len(self._events), version=self.version)
+
+            self._last_sync = time.monotonic()
+
+    # --- LOCAL WRITES ---
+    def upsert(self, event):
+        """
+        Records an event returned by insert/patch so reads see it without a sync.
+        """
+        if not event or 'id' not in event: return
+        with self._lock:
+            self._apply(event)
+            self.version += 1
+
+    def remove(self, event_id):
+        with self._lock:
+            if self._drop(event_id) is not None: self.version += 1
+
+    # --- READS ---
+    def between(self, start_iso, end_iso, keyword=""):
+        """
+        Events overlapping [start, end), ordered by start time.
+        Mirrors events().list(timeMin=..., timeMax=..., q=...).
+        """
+        self.refresh()
+        start_dt = datetime.datetime.fromisoformat(start_iso)
+        end_dt = datetime.datetime.fromisoformat(end_iso)
+        keyword = keyword.lower()
+
+        entries = self._overlapping(start_dt, end_dt)
+        return [event for _, _, event in entries if not keyword or self._matches(event, keyword)]
+
+    def find(self, keyword, start_iso, end_iso, min_similarity=0.5):
+        """
+        Events overlapping [start, end) whose title or category fuzzily matches `keyword`, best first.
+        Ranked by similarity, weighted towards events close to now (or to the range, if it is in the future).
+        """
+        self.refresh()
+        start_dt = datetime.datetime.fromisoformat(start_iso)
+        end_dt = datetime.datetime.fromisoformat(end_iso)
+        anchor = min(max(datetime.datetime.now(self.tz), start_dt), end_dt)
+
+        with self._lock:
+            scores = self._titles.search(keyword, min_similarity)
+            entries = [(self._events[event_id], score) for event_id, score in scores.items() if event_id in self._events]
+
+        ranked = []
+        for (ev_start, ev_end, event), similarity in entries:
+            if ev_end <= start_dt or ev_start >= end_dt: continue
+            days_away = abs((ev_start - anchor).total_seconds()) / 86400
+            ranked.append((similarity * (0.8 + 0.2 / (1 + days_away)), event))
+        ranked.sort(key=lambda r: r[0], reverse=True)
+        return [event for _, event in ranked]
+
+    def search_remote(self, keyword, start_iso, end_iso):
+        """
+        Server-side q= search, for what find() cannot see: matches in descriptions, or events added since the last sync.
+        Results are recorded in the store.
+        """
+        events = []
+        for page in self._list_pages(q=keyword, timeMin=start_iso, timeMax=end_iso, orderBy='startTime'):
+            events.extend(item for item in page.get('items', []) if item.get('status') != 'cancelled')
+        with self._lock:
+            for event in events: self._apply(event)
+            if events: self.version += 1
+        return events
+
+    def days(self, start_iso, days):
+        """
+        Events over `days` consecutive days from start_iso as [(date, [events])], one bucket per day.
+        Events that began before the range land on its first day.
+        """
+        start_dt = datetime.datetime.fromisoformat(start_iso)
+        # The same wall-clock time `days` later, so a DST change inside the range does not shift the end by an hour
+        end_dt = self.tz.localize(datetime.datetime.combine(start_dt.date() + datetime.timedelta(days=days), start_dt.time()))
+        buckets = [(start_dt.date() + datetime.timedelta(days=i), []) for i in range(days)]
+        for event in self.between(start_iso, end_dt.isoformat()):
+            day = self._parse_bound(event.get('start', {})).astimezone(self.tz).date()
+            index = max(0, (day - start_dt.date()).days)
+            if index < days: buckets[index][1].append(event)
+        return buckets
+
+    def upcoming(self, max_results=10):
+        """
+        The next events that have not ended yet, ordered by start time.
+        """
+        self.refresh()
+        now = datetime.datetime.now(self.tz)
+        # Widen a window from a week out until it holds enough events, rather than sorting everything ahead
+        for weeks in (1, 4, 16):
+            entries = self._overlapping(now, now + datetime.timedelta(weeks=weeks))
+            if len(entries) >= max_results: break
+        else:
+            entries = self._overlapping(now, datetime.datetime.max.replace(tzinfo=pytz.utc))
+        return [event for _, _, event in entries[:max_results]]
+
+    def conflicts(self, start_dt, end_dt, ignore_id=None):
+        """
+        Timed events overlapping [start, end). All-day events are treated as free time, as Calendar does.
+        """
+        self.refresh()
+        return [
+            event for _, _, event in self._overlapping(start_dt, end_dt)
+            if event.get('start', {}).get('dateTime') and event.get('id') != ignore_id
+        ]
+
+    def free_slots(self, start_dt, end_dt, min_duration):
+        """
+        Gaps of at least `min_duration` (a timedelta) between the timed events in [start, end), as [(start, end)].
+        """
+        self.refresh()
+        slots = []
+        cursor = start_dt
+        for ev_start, ev_end, event in self._overlapping(start_dt, end_dt):
+            if not event.get('start', {}).get('dateTime'): continue
+            if ev_start - cursor >= min_duration: slots.append((cursor, ev_start))
+            cursor = max(cursor, ev_end)
+        if end_dt - cursor >= min_duration: slots.append((cursor, end_dt))
+        return slots
+
+    # --- INTERNALS ---
+    def _overlapping(self, start_dt, end_dt):
+        # [(start_dt, end_dt, event)] overlapping the range, ordered by start
+        with self._lock:
+            ids = self._intervals.overlapping(self._timestamp(start_dt), self._timestamp(end_dt))
+            entries = [self._events[event_id] for event_id in ids]
+        entries.sort(key=lambda e: e[0])
+        return entries
+
+    def _apply(self, item):
+        if item.get('status') == 'cancelled':
+            self._drop(item['id'])
+        else:
+            self._put(item['id'], self._entry(item))
+
+    def _put(self, event_id, entry):
+        self._events[event_id] = entry
+        self._titles.add(event_id, entry[2].get('summary'))
+        self._intervals.add(event_id, self._timestamp(entry[0]), self._timestamp(entry[1]))
+
+    def _drop(self, event_id):
+        self._titles.remove(event_id)
+        self._intervals.remove(event_id)
+        return self._events.pop(event_id, None)
+
+    @staticmethod
+    def _timestamp(dt):
+        try:
+            return dt.timestamp()
+        except (OverflowError, ValueError, OSError):
+            return float("-inf") if dt.year < 1970 else float("inf")
+
+    def _entry(self, event):
+        return (self._parse_bound(event.get('start', {})), self._parse_bound(event.get('end', {})), event)
+
+    def _parse_bound(self, bound):
+        if bound.get('dateTime'):
+            dt = datetime.datetime.fromisoformat(bound['dateTime'].replace('Z', '+00:00'))
+            return dt if dt.tzinfo else self.tz.localize(dt)
+        if bound.get('date'):
+            return self.tz.localize(datetime.datetime.strptime(bound['date'], "%Y-%m-%d"))
+        return datetime.datetime.min.replace(tzinfo=pytz.utc)
+
+    @staticmethod
+    def _matches(event, keyword):
+        return keyword in event.get('summary', '').lower() or keyword in event.get('description', '').lower()
@@ -0,0 +1,477 @@
+"""
+Offline stand-ins for the services the backend talks to: Gemini, Google Calendar, Google Sheets,
+SMTP, Google speech recognition and edge-tts. Each one can inject latency and failures, and records how long its calls took
+in a shared Timings object, so the whole pipeline can be exercised (and timed) without credentials.
+
+    timings = Timings()
+    backend.use_services(
+        calendar=FakeCalendar(timings=timings), sheets=FakeSheets(timings=timings),
+        pool=KeyPool(["offline"], client_factory=lambda key: FakeModelClient(timings=timings)),
+    )
+"""
+import asyncio
+import collections
+import datetime
+import random
+import re
+import socketserver
+import threading
+import time
+
+import httplib2
+import pytz
+from googleapiclient.errors import HttpError
+
+import intents
+
+
+class Timings:
+    """
+    Thread-safe latency samples per stage, with percentiles.
+    """
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def percentile(self, stage, pct):
+        with self._lock:
+            values = sorted(self.samples.get(stage, []))
+        if not values: return None
+        return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+    def summary(self):
+        """
+        {stage: {'count', 'p50', 'p95', 'p99'}} in seconds.
+        """
+        with self._lock:
+            stages = list(self.samples)
+        return {
+            stage: {
+                'count': len(self.samples[stage]),
+                'p50': self.percentile(stage, 50), 'p95': self.percentile(stage, 95), 'p99': self.percentile(stage, 99),
+            }
+            for stage in stages
+        }
+
+
+class Injector:
+    """
+    Latency (base seconds, jittered +/-50%) and a failure rate for one fake service.
+    """
+
+    def __init__(self, stage, latency=0.0, error_rate=0.0, timings=None):
+        self.stage = stage
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timings = timings
+
+    def call(self, fn, make_error):
+        started = time.perf_counter()
+        try:
+            if self.latency: time.sleep(self.latency * random.uniform(0.5, 1.5))
+            if self.error_rate and random.random() < self.error_rate: raise make_error()
+            return fn()
+        finally:
+            if self.timings: self.timings.record(self.stage, time.perf_counter() - started)
+
+
+def http_error(status=503):
+    return HttpError(httplib2.Response({'status': status}), b'{"error": {"message": "injected failure"}}')
+
+
+# --- GOOGLE API CLIENT SHAPES ---
+class FakeRequest:
+    """
+    Looks like googleapiclient's HttpRequest: .execute() runs the operation.
+    """
+
+    def __init__(self, injector, operation):
+        self.injector = injector
+        self.operation = operation
+
+    def execute(self, http=None, num_retries=0):
+        return self.injector.call(self.operation, http_error)
+
+
+class FakeBatch:
+    """
+    Looks like BatchHttpRequest: one injected round trip, then a callback per request.
+    """
+
+    def __init__(self, injector, callback=None):
+        self.injector = injector
+        self.callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request_id or str(len(self._requests)), request, callback or self.callback))
+
+    def execute(self, http=None):
+        def run_all():
+            for request_id, request, callback in self._requests:
+                try:
+                    response, exception = request.operation(), None
+                except HttpError as e:
+                    response, exception = None, e
+                if callback: callback(request_id, response, exception)
+        self.injector.call(run_all, http_error)
+
+
+class FakeCalendar:
+    """
+    In-memory Calendar v3: events().list (time range, q, paging, syncToken), insert, patch, delete,
+    plus new_batch_http_request. Deleted events show up as cancelled in incremental syncs.
+    """
+
+    def __init__(self, events=(), latency=0.0, error_rate=0.0, timings=None, page_size=250):
+        self.injector = Injector('calendar', latency, error_rate, timings)
+        self.page_size = page_size
+        self._events = {}  # id -> event
+        self._changed = {}  # id -> sequence number of its last change
+        self._sequence = 0
+        self._lock = threading.Lock()
+        for event in events:
+            self._store(dict(event, id=event.get('id') or self._new_id()))
+
+    # --- service surface ---
+    def events(self):
+        return self
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self.injector, callback)
+
+    def list(self, calendarId=None, pageToken=None, maxResults=None, syncToken=None, timeMin=None, timeMax=None,
+             q=None, **params):
+        return FakeRequest(self.injector, lambda: self._list(pageToken, maxResults, syncToken, timeMin, timeMax, q))
+
+    def insert(self, calendarId=None, body=None, **params):
+        return FakeRequest(self.injector, lambda: self._store(dict(body, id=self._new_id(), status='confirmed')))
+
+    def patch(self, calendarId=None, eventId=None, body=None, **params):
+        def operation():
+            with self._lock:
+                if eventId not in self._events: raise http_error(404)
+                event = dict(self._events[eventId], **body)
+            return self._store(event)
+        return FakeRequest(self.injector, operation)
+
+    def delete(self, calendarId=None, eventId=None, **params):
+        def operation():
+            with self._lock:
+                if self._events.pop(eventId, None) is None: raise http_error(410)
+                self._sequence += 1
+                self._changed[eventId] = self._sequence
+            return ''
+        return FakeRequest(self.injector, operation)
+
+    # --- internals ---
+    def _new_id(self):
+        return f"fake{random.getrandbits(48):012x}"
+
+    def _store(self, event):
+        with self._lock:
+            self._sequence += 1
+            self._events[event['id']] = event
+            self._changed[event['id']] = self._sequence
+        return dict(event)
+
+    def _list(self, page_token, max_results, sync_token, time_min, time_max, q):
+        with self._lock:
+            if sync_token:
+                since = int(sync_token)
+                items = [
+                    dict(self._events[event_id]) if event_id in self._events else {'id': event_id, 'status': 'cancelled'}
+                    for event_id, sequence in self._changed.items() if sequence > since
+                ]
+            else:
+                items = [dict(event) for event in self._events.values() if self._in_range(event, time_min, time_max, q)]
+                items.sort(key=lambda e: e['start'].get('dateTime', e['start'].get('date', '')))
+            sequence = self._sequence
+
+        offset = int(page_token or 0)
+        size = min(max_results or self.page_size, self.page_size)
+        page = {'items': items[offset:offset + size]}
+        if offset + size < len(items):
+            page['nextPageToken'] = str(offset + size)
+        else:
+            page['nextSyncToken'] = str(sequence)
+        return page
+
+    @staticmethod
+    def _in_range(event, time_min, time_max, q):
+        def bound(value):
+            dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return dt if dt.tzinfo else pytz.utc.localize(dt)
+        start = event['start'].get('dateTime') or event['start'].get('date') + 'T00:00:00+00:00'
+        end = event['end'].get('dateTime') or event['end'].get('date') + 'T00:00:00+00:00'
+        if time_min and bound(end) <= bound(time_min): return False
+        if time_max and bound(start) >= bound(time_max): return False
+        if q and q.lower() not in (event.get('summary', '') + event.get('description', '')).lower(): return False
+        return True
+
+
+class FakeSheets:
+    """
+    In-memory Sheets v4 with just spreadsheets().values().append. Appended rows land in .rows.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, timings=None):
+        self.injector = Injector('sheets', latency, error_rate, timings)
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def append(self, spreadsheetId=None, range=None, valueInputOption=None, body=None, **params):
+        def operation():
+            with self._lock:
+                self.rows.extend(body.get('values', []))
+            return {'updates': {'updatedRows': len(body.get('values', []))}}
+        return FakeRequest(self.injector, operation)
+
+
+# --- GEMINI ---
+PREAMBLE = re.compile(r"^\(Current Time: [^)]*\)\s*")
+ADD = re.compile(r"(?:add|schedule|remind me to) (?P<summary>.+?)(?: (?:for|on|due))?(?: (?P<day>today|tomorrow))?"
+                 r"(?: at (?P<time>\d{1,2}(?::\d{2})?(?: ?[ap]m)?))?$")
+NOTIFY = re.compile(r"(?:email|notify|text|message) me(?: about| that| to)? (?P<message>.+)")
+MOVE = re.compile(r"(?:move|reschedule|push) (?:the |my )?(?P<keyword>.+?) to (?P<time>\d{1,2}(?::\d{2})? ?[ap]m)")
+
+
+def scripted_call(text, timezone="America/New_York"):
+    """
+    The tool call a cooperative model would make for an utterance, or None to just talk.
+    """
+    intent = intents.parse(text, timezone)
+    if intent: return {'name': intent.name, 'args': intent.args}
+
+    normalized = intents.normalize(text)
+    match = MOVE.search(normalized)
+    if match:
+        return {'name': 'update_event', 'args': {'keyword': match['keyword'], 'new_start_time': match['time'].upper()}}
+    match = NOTIFY.search(normalized)
+    if match:
+        return {'name': 'send_notification', 'args': {'message': match['message']}}
+    match = ADD.fullmatch(normalized)
+    if match:
+        day = datetime.datetime.now(pytz.timezone(timezone)).date()
+        if match['day'] == 'tomorrow': day += datetime.timedelta(days=1)
+        clock = datetime.time(9)
+        if match['time']:
+            spoken = match['time'].replace(' ', '').upper()
+            for fmt in ("%I%p", "%I:%M%p", "%H:%M", "%H"):
+                try:
+                    clock = datetime.datetime.strptime(spoken, fmt).time()
+                    break
+                except ValueError:
+                    continue
+        return {'name': 'add_to_schedule', 'args': {
+            'summary': match['summary'], 'date_time': datetime.datetime.combine(day, clock).isoformat(),
+            'item_type': 'To-Do Item', 'category': 'General',
+        }}
+    return None
+
+
+def default_script(request):
+    """
+    Function results -> a one-sentence answer; a user message -> the matching tool call, if any.
+    Requests without tools (the memory summarizer) get a short summary back.
+    """
+    last = request.contents[-1]
+    results = [part.function_response for part in last.parts if part.function_response]
+    if results:
+        said = " ".join(str(dict(result.response).get('result', '')) for result in results)
+        return f"Here is what I found. {said}"
+
+    text = PREAMBLE.sub("", " ".join(part.text for part in last.parts if part.text))
+    if not request.tools: return f"The user and assistant discussed: {text[:120]}"
+    return scripted_call(text) or "Happy to help with that."
+
+
+class FakeModelClient:
+    """
+    Stands in for GenerativeServiceClient, so the real SDK (ChatSession, history, function calling)
+    runs on top of it. `script(request)` decides each reply: a string (text), a
+    {'name': ..., 'args': ...} dict (function call), or a list of those.
+    `latency` is the time to the first token; streamed replies then arrive `chunk_delay` apart.
+    """
+
+    def __init__(self, script=default_script, latency=0.0, error_rate=0.0, chunk_delay=0.0, timings=None):
+        self.script = script
+        self.injector = Injector('model', latency, error_rate, timings)
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+
+    def generate_content(self, request, **options):
+        self.calls += 1
+        return self.injector.call(lambda: self._response(self._parts(request), request, final=True), self._error)
+
+    def stream_generate_content(self, request, **options):
+        self.calls += 1
+        parts = self.injector.call(lambda: self._parts(request), self._error)
+        return self._stream(parts, request)
+
+    # --- internals ---
+    @staticmethod
+    def _error():
+        from google.api_core.exceptions import ServiceUnavailable
+        return ServiceUnavailable("injected failure")
+
+    def _parts(self, request):
+        from google.generativeai import protos
+        reply = self.script(request)
+        parts = []
+        for item in reply if isinstance(reply, list) else [reply]:
+            if isinstance(item, dict):
+                parts.append(protos.Part(function_call=protos.FunctionCall(name=item['name'], args=item.get('args', {}))))
+            else:
+                parts.append(protos.Part(text=item))
+        return parts
+
+    def _stream(self, parts, request):
+        text = "".join(part.text for part in parts if part.text)
+        if not text:
+            yield self._response(parts, request, final=True)
+            return
+        words = re.findall(r"\S+\s*", text)
+        for index in range(0, len(words), 4):
+            if index: time.sleep(self.chunk_delay)
+            chunk = "".join(words[index:index + 4])
+            yield self._response([type(parts[0])(text=chunk)], request, final=index + 4 >= len(words))
+
+    @staticmethod
+    def _response(parts, request, final):
+        from google.generativeai import protos
+        prompt_tokens = sum(len(str(content)) for content in request.contents) // 4
+        output_tokens = sum(len(part.text) if part.text else 20 for part in parts) // 4
+        return protos.GenerateContentResponse(
+            candidates=[protos.Candidate(
+                content=protos.Content(role="model", parts=parts), finish_reason="STOP" if final else None, index=0,
+            )],
+            usage_metadata=protos.GenerateContentResponse.UsageMetadata(
+                prompt_token_count=prompt_tokens, candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+
+# --- SMTP ---
+class FakeSMTPServer:
+    """
+    A minimal plaintext SMTP server on localhost (no auth, no TLS). Received messages land in .messages.
+    Point NotificationDispatcher at it with use_ssl=False and no password.
+    """
+
+    def __init__(self, latency=0.0, timings=None):
+        self.messages = []
+        self.connections = 0
+        self.latency = latency  # per accepted message
+        self.timings = timings
+        self._server = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                fake.connections += 1
+                self.reply("220 fake-smtp ready")
+                data = None
+                for raw in self.rfile:
+                    line = raw.decode('utf8', errors='replace').rstrip('\r\n')
+                    if data is not None:
+                        if line != '.':
+                            data.append(line[1:] if line.startswith('..') else line)
+                            continue
+                        started = time.perf_counter()
+                        if fake.latency: time.sleep(fake.latency)
+                        fake.messages.append("\n".join(data))
+                        if fake.timings: fake.timings.record('smtp', time.perf_counter() - started)
+                        data = None
+                        self.reply("250 OK")
+                        continue
+                    verb = line[:4].upper()
+                    if verb in ("EHLO", "HELO"): self.reply("250 fake-smtp")
+                    elif verb == "DATA":
+                        data = []
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else: self.reply("250 OK")
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-smtp", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+# --- SPEECH TO TEXT ---
+class FakeRecognizer:
+    """
+    Replacement for speech_recognition.Recognizer.recognize_google: waits `latency` and returns
+    the next of `phrases`, round robin, whatever the audio.
+
+        voice_engine.sr.Recognizer.recognize_google = FakeRecognizer(["Tell me a joke"]).recognize_google
+    """
+
+    def __init__(self, phrases, latency=0.0, timings=None):
+        self.phrases = phrases
+        self.latency = latency
+        self.timings = timings
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def recognize_google(self, audio_data, *args, **kwargs):
+        started = time.perf_counter()
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        with self._lock:
+            phrase = self.phrases[self._next % len(self.phrases)]
+            self._next += 1
+        if self.timings: self.timings.record('stt', time.perf_counter() - started)
+        return phrase
+
+
+# --- TEXT TO SPEECH ---
+class FakeTTS:
+    """
+    Replacement for voice_engine._synthesize: waits `latency`, then streams silence-sized chunks
+    (~48 kbit/s at ~15 characters per second of speech) spread over `per_char` per character.
+    """
+
+    def __init__(self, latency=0.0, per_char=0.0, timings=None, chunks=4):
+        self.latency = latency
+        self.per_char = per_char
+        self.timings = timings
+        self.chunks = chunks
+
+    async def stream(self, text, voice="en-GB-RyanNeural"):
+        started = time.perf_counter()
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        size = len(text) * 400
+        step = -(-size // self.chunks) or 1
+        for offset in range(0, size, step):
+            await asyncio.sleep(self.per_char * len(text) / self.chunks)
+            yield b"\0" * min(step, size - offset)
+        if self.timings: self.timings.record('tts', time.perf_counter() - started)
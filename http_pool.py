@@ -0,0 +1,75 @@
+import contextlib
+import threading
+
+import httplib2
+
+# The connection itself failed (reset, timeout, bad status line): it may be mid-response, so it is not reused.
+# An HttpError is a complete response, e.g. a 404 or a 410 for an expired sync token, and leaves it reusable.
+TRANSPORT_ERRORS = (OSError, httplib2.HttpLib2Error)
+
+
+class HttpPool:
+    """
+    A bounded set of HTTP transports shared by every thread.
+    httplib2.Http is not thread-safe, so each request checks a transport out for its duration and hands it back.
+    Transports are created on demand up to `size`; past that, callers wait for one to come back.
+    Unlike one transport per thread, connections stay warm however many session and tool threads come and go.
+    """
+
+    def __init__(self, factory, size=8):
+        self.factory = factory  # fn() -> transport, e.g. an AuthorizedHttp
+        self.size = size
+        self._idle = []  # LIFO, so the most recently used (warmest) connection goes out first
+        self._created = 0
+        self._cond = threading.Condition()
+        self.stats = {'checkouts': 0, 'created': 0, 'waits': 0, 'discarded': 0}
+
+    @contextlib.contextmanager
+    def connection(self):
+        http = self._acquire()
+        try:
+            yield http
+        except TRANSPORT_ERRORS:
+            self._release(http, broken=True)
+            raise
+        except Exception:
+            self._release(http)
+            raise
+        self._release(http)
+
+    def execute(self, request):
+        with self.connection() as http:
+            return request.execute(http=http)
+
+    def report(self):
+        with self._cond:
+            return dict(self.stats, idle=len(self._idle), in_use=self._created - len(self._idle), size=self.size)
+
+    # --- INTERNALS ---
+    def _acquire(self):
+        with self._cond:
+            self.stats['checkouts'] += 1
+            if not self._idle and self._created >= self.size:
+                self.stats['waits'] += 1
+                while not self._idle and self._created >= self.size:
+                    self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+            self.stats['created'] += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, http, broken=False):
+        with self._cond:
+            if broken:
+                self._created -= 1
+                self.stats['discarded'] += 1
+            else:
+                self._idle.append(http)
+            self._cond.notify()
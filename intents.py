@@ -0,0 +1,185 @@
+import collections
+import datetime
+import re
+
+import pytz
+
+# A recognized command: which tool to run, its arguments, how sure we are, and how to say the date out loud
+Intent = collections.namedtuple("Intent", ["name", "args", "confidence", "label"])
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Spoken item nouns -> the "Type:" written into event descriptions by add_to_schedule
+ITEM_TYPES = {
+    "to-do": "To-Do Item", "to-dos": "To-Do Item", "todo": "To-Do Item", "todos": "To-Do Item",
+    "to-do items": "To-Do Item", "todo items": "To-Do Item", "tasks": "To-Do Item",
+    "meetings": "Meeting", "assignments": "Assignment", "exams": "Exam",
+}
+EVERYTHING = ("events", "everything", "schedule", "calendar")
+
+DATE = r"(?P<date>today|tonight|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday|\d{4}-\d{2}-\d{2})"
+# Deletes take whole days only: "tonight" is part of one, so "clear tonight" is left to the model
+DELETE_DATE = DATE.replace("|tonight", "")
+ON = r"(?: for| on)?"
+NOUN = r"(?P<noun>to-?do(?: items|s)?|tasks|meetings|assignments|exams|events|everything|schedule|calendar)"
+
+PATTERNS = [
+    ("check_schedule", rf"(?:whats|what is) (?:on|happening|going on){ON} {DATE}"),
+    ("check_schedule", rf"(?:whats|what is)(?: on)? my (?:schedule|calendar|agenda)(?: look)?(?: like)?{ON} {DATE}"),
+    ("check_schedule", rf"what do i have(?: going on)?{ON} {DATE}"),
+    ("check_schedule", rf"(?:check|show|read)(?: me)? my (?:schedule|calendar|agenda){ON} {DATE}"),
+    ("check_schedule", rf"(?:do i have )?anything{ON} {DATE}"),
+    ("check_schedule", r"(?:whats|what is|what does)(?: on)? my (?P<week>week)(?: look)?(?: like)?"),
+    ("check_schedule", r"(?:whats|what is|what do i have) (?:on |happening |going on )?(?:(?P<week>this week)|over the next (?P<days>\d+) days)"),
+    ("find_free_slots", rf"(?:when am i|am i|when (?:am|will) i be) (?:free|available){ON}(?: {DATE})?(?: (?:in the )?(?P<part>morning|afternoon|evening))?"),
+    ("list_upcoming_events", r"(?:list|show|read|tell me)(?: me)?(?: all)?(?: my)?(?: next (?P<count>\d+))? (?:upcoming |next )?(?:events|meetings)"),
+    ("list_upcoming_events", r"(?:whats|what is) (?:coming up|next)(?: on my (?:schedule|calendar))?"),
+    ("list_upcoming_events", r"(?:what are )?my (?:upcoming|next) (?:events|meetings)"),
+    ("delete_events", rf"(?:clear|delete|remove|cancel)(?: all)?(?: of)?(?: my)? {DELETE_DATE}s? {NOUN}"),
+    ("delete_events", rf"(?:clear|delete|remove|cancel)(?: all)?(?: of)?(?: my)? {NOUN}{ON} {DELETE_DATE}"),
+    ("delete_events", rf"clear {DELETE_DATE}"),
+]
+COMPILED = [(name, re.compile(pattern)) for name, pattern in PATTERNS]
+
+# Spoken parts of the day -> (earliest, latest) for find_free_slots
+DAY_PARTS = {"morning": ("08:00", "12:00"), "afternoon": ("12:00", "17:00"), "evening": ("17:00", "22:00")}
+
+FILLERS = re.compile(r"^(?:(?:hey|ok|okay) )?(?:naomi )?(?:(?:can|could) you )?(?:please )?|(?: please| for me| thanks)$")
+
+
+def normalize(text):
+    text = text.lower().replace("’", "'").replace("'", "")
+    text = re.sub(r"[^\w\s-]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return FILLERS.sub("", text).strip()
+
+
+def resolve_date(word, timezone):
+    """
+    Spoken date -> (date_str for get_date_range, label to say it back).
+    Weekdays mean the next occurrence, today included.
+    """
+    if word in ("today", "tonight"): return "today", "today"
+    if word == "tomorrow": return "tomorrow", "tomorrow"
+
+    today = datetime.datetime.now(pytz.timezone(timezone)).date()
+    if word in WEEKDAYS:
+        target = today + datetime.timedelta(days=(WEEKDAYS.index(word) - today.weekday()) % 7)
+        if target == today: return "today", "today"
+        return target.isoformat(), f"on {word.title()}"
+
+    target = datetime.date.fromisoformat(word)
+    return word, f"on {target.strftime('%B')} {target.day}"
+
+
+def find_date(text, timezone):
+    """
+    The date_str of the first spoken date in a (normalized) utterance, "today" if there is none.
+    """
+    match = re.search(rf"\b{DATE}\b", text)
+    return resolve_date(match.group("date") if match else "today", timezone)[0]
+
+
+FOLLOW_UP = re.compile(r"^(?:and|but|also|then|so|what about|how about)\b")
+
+def self_contained(text, timezone):
+    """
+    Whether a (normalized) utterance can be answered without the conversation before it:
+    a recognized command, or one that names its date and does not open as a follow-up ("and the afternoon?").
+    """
+    if parse(text, timezone): return True
+    return bool(re.search(rf"\b{DATE}\b", text)) and not FOLLOW_UP.match(text)
+
+
+def parse(text, timezone):
+    """
+    Matches a command against the known phrasings.
+    A whole-utterance match is confident (1.0); a phrase buried in a longer request is not (0.5),
+    because the rest of the sentence may change what the user wants.
+    """
+    normalized = normalize(text)
+    matches = [(name, pattern.fullmatch(normalized), 1.0) for name, pattern in COMPILED]
+    matches += [(name, pattern.search(normalized), 0.5) for name, pattern in COMPILED]
+    for name, match, confidence in matches:
+        if not match: continue
+
+        groups = match.groupdict()
+        try:
+            date_str, label = resolve_date(groups.get("date") or "today", timezone)
+        except ValueError:
+            return None # an impossible date ("2026-02-30") is the model's to question
+
+        if name == "check_schedule":
+            days = 7 if groups.get("week") else min(int(groups.get("days") or 1), 31)
+            if days > 1:
+                label = "this week" if groups.get("week") else f"over the next {days} days"
+                return Intent(name, {"date_str": date_str, "days": days}, confidence, label)
+            return Intent(name, {"date_str": date_str}, confidence, label)
+        if name == "find_free_slots":
+            part = groups.get("part")
+            earliest, latest = DAY_PARTS.get(part, ("08:00", "22:00"))
+            args = {"date_str": date_str, "duration_minutes": 30, "earliest": earliest, "latest": latest}
+            if part: label = f"this {part}" if label == "today" else f"{label} {part}"
+            return Intent(name, args, confidence, label)
+        if name == "list_upcoming_events":
+            return Intent(name, {"max_results": int(groups.get("count") or 10)}, confidence, "")
+
+        noun = (groups.get("noun") or "everything").replace("todo", "to-do")
+        if noun not in EVERYTHING and noun not in ITEM_TYPES: return None
+        return Intent(name, {"date_str": date_str, "item_type": ITEM_TYPES.get(noun, "")}, confidence, label)
+    return None
+
+
+# --- VOICE-READY PROSE ---
+def spoken_time(iso_str):
+    if "T" not in iso_str: return "all day"
+    dt = datetime.datetime.fromisoformat(iso_str)
+    return dt.strftime("%I:%M %p").lstrip("0").replace(":00", "")
+
+def spoken_title(summary):
+    # "[IEEE] Weekly sync" -> "Weekly sync for IEEE"
+    match = re.match(r"\[(.+?)\]\s*(.*)", summary or "")
+    if not match: return summary or "an untitled event"
+    category, title = match.groups()
+    return title if category == "General" else f"{title} for {category}"
+
+def join_spoken(items):
+    if len(items) == 1: return items[0]
+    if len(items) == 2: return f"{items[0]} and {items[1]}"
+    return ", ".join(items[:-1]) + f", and {items[-1]}"
+
+def describe_event(event):
+    start = event['start'].get('dateTime', event['start'].get('date'))
+    when = spoken_time(start)
+    return f"{spoken_title(event.get('summary'))} {when}" if when == "all day" else f"{spoken_title(event.get('summary'))} at {when}"
+
+def describe_day(events, label):
+    if not events: return f"You have nothing scheduled {label}."
+    if len(events) == 1: return f"You have one thing {label}: {describe_event(events[0])}."
+    return f"You have {len(events)} things {label}: {join_spoken([describe_event(e) for e in events])}."
+
+def describe_days(days, label):
+    # days: [(date, [events])] as returned by EventStore.days
+    busy = [(day, events) for day, events in days if events]
+    if not busy: return f"You have nothing scheduled {label}."
+    name = (lambda day: day.strftime("%A")) if len(days) <= 7 else (lambda day: f"{day.strftime('%A, %B')} {day.day}")
+    said = " ".join(f"{name(day)}, {join_spoken([describe_event(e) for e in events])}." for day, events in busy)
+    reply = f"Here is your schedule {label}. {said}"
+    if len(busy) < len(days): reply += " The other days are free."
+    return reply
+
+def describe_free(slots, label):
+    if not slots: return f"You have no free time {label}."
+    said = join_spoken([f"{spoken_time(start.isoformat())} to {spoken_time(end.isoformat())}" for start, end in slots])
+    return f"You are free {label} from {said}."
+
+def describe_upcoming(events):
+    if not events: return "You have no upcoming events."
+    return f"Coming up, you have {join_spoken([describe_event(e) for e in events])}."
+
+def describe_deleted(count, failed, label, item_type):
+    noun = f"{item_type.lower()}s" if item_type else "events"
+    if not count and not failed: return f"There were no {noun} to remove {label}."
+    reply = f"Done. I removed {count} {noun if count != 1 else noun[:-1]} {label}."
+    if failed: reply += f" {failed} could not be removed."
+    return reply
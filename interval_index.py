@@ -0,0 +1,54 @@
+import bisect
+
+
+class IntervalIndex:
+    """
+    Event intervals (epoch seconds) sorted by start, for overlap queries in O(log n + matches).
+    Anything overlapping [a, b) starts before b and, being at most `span` long, after a - span.
+    The few intervals longer than `span` (multi-day events) are kept aside and scanned directly.
+    """
+
+    def __init__(self, span=86400.0):
+        self.span = span
+        self._starts = []  # sorted (start, event_id)
+        self._ends = {}  # event_id -> end
+        self._long = {}  # event_id -> (start, end), for intervals longer than span
+        self._by_id = {}  # event_id -> start
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def add(self, event_id, start, end):
+        self.remove(event_id)
+        self._by_id[event_id] = start
+        if end - start > self.span:
+            self._long[event_id] = (start, end)
+        else:
+            bisect.insort(self._starts, (start, event_id))
+            self._ends[event_id] = end
+
+    def remove(self, event_id):
+        start = self._by_id.pop(event_id, None)
+        if start is None: return
+        if self._long.pop(event_id, None) is not None: return
+        index = bisect.bisect_left(self._starts, (start, event_id))
+        if index < len(self._starts) and self._starts[index] == (start, event_id):
+            del self._starts[index]
+        del self._ends[event_id]
+
+    def clear(self):
+        self._starts.clear()
+        self._ends.clear()
+        self._long.clear()
+        self._by_id.clear()
+
+    def overlapping(self, a, b):
+        """
+        Ids of intervals overlapping [a, b), ordered by start (long intervals first).
+        """
+        ids = [event_id for event_id, (start, end) in sorted(self._long.items(), key=lambda item: item[1])
+               if start < b and end > a]
+        lo = bisect.bisect_left(self._starts, (a - self.span,))
+        hi = bisect.bisect_left(self._starts, (b,))
+        ids += [event_id for _, event_id in self._starts[lo:hi] if self._ends[event_id] > a]
+        return ids
@@ -0,0 +1,176 @@
+import collections
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class KeyState:
+    """
+    Health bookkeeping for one API key.
+    """
+    def __init__(self, index, key):
+        self.index = index
+        self.key = key
+        self.client = None
+        self.in_flight = 0
+        self.strikes = 0  # consecutive transient failures, drives the backoff exponent
+        self.cooldown_until = 0.0
+        self.latency = None  # EWMA of successful request latency (seconds)
+        self.requests = collections.deque()  # timestamps, for the per-key request rate
+        self.failures = collections.deque()  # (timestamp, error name) of recent transient failures
+
+    def snapshot(self, now):
+        return {
+            'index': self.index,
+            'in_flight': self.in_flight,
+            'requests_per_min': len(self.requests),
+            'recent_failures': [name for _, name in self.failures],
+            'cooldown_remaining': round(max(0.0, self.cooldown_until - now), 2),
+            'latency_ms': round(self.latency * 1000) if self.latency is not None else None,
+        }
+
+
+class KeyPool:
+    """
+    Picks the healthiest Gemini API key per request instead of rotating one global key.
+    - Tracks per-key request rate and recent ResourceExhausted / DeadlineExceeded / ServiceUnavailable errors.
+    - Keys that hit those errors cool down with jittered exponential backoff.
+    - call() can hedge a slow request onto a second key and take whichever answers first.
+    Each key gets its own client, so nothing touches the process-global genai.configure state.
+    """
+
+    def __init__(self, keys, cooldown_base=2.0, cooldown_max=120.0, window=60.0, max_wait=10.0, client_factory=None):
+        self.keys = [KeyState(i, key) for i, key in enumerate(keys)]
+        self.client_factory = client_factory  # fn(api_key) -> GenerativeServiceClient-like; None = the real client
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self.window = window  # seconds of history used for rate and failure counts
+        self.max_wait = max_wait  # longest we will sleep for a key to come off cooldown
+        self._lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+    def __len__(self):
+        return len(self.keys)
+
+    # --- SELECTION ---
+    def _prune(self, state, now):
+        while state.requests and now - state.requests[0] > self.window: state.requests.popleft()
+        while state.failures and now - state.failures[0][0] > self.window: state.failures.popleft()
+
+    def _score(self, state):
+        return (len(state.failures), state.in_flight, len(state.requests), state.latency or 0.0)
+
+    def acquire(self, exclude=(), wait=True):
+        """
+        Reserves the healthiest key not in `exclude`. Waits (up to max_wait) if every key is cooling down,
+        unless wait=False. Returns None when no key can be used.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [s for s in self.keys if s.index not in exclude]
+                if not candidates: return None
+                for state in candidates: self._prune(state, now)
+
+                ready = [s for s in candidates if s.cooldown_until <= now]
+                if ready:
+                    state = min(ready, key=self._score)
+                    state.in_flight += 1
+                    state.requests.append(now)
+                    return state
+
+                delay = min(s.cooldown_until for s in candidates) - now
+            if not wait or delay > self.max_wait: return None
+            time.sleep(delay)
+
+    def release(self, state, latency=None, error=None):
+        with self._lock:
+            state.in_flight -= 1
+            now = time.monotonic()
+            if error is None:
+                state.strikes = 0
+                if latency is not None:
+                    state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                return
+
+            # Imported here: google.api_core pulls in grpc, which is slow to import
+            from google.api_core.exceptions import ResourceExhausted, DeadlineExceeded, ServiceUnavailable
+            if isinstance(error, (ResourceExhausted, DeadlineExceeded, ServiceUnavailable)):
+                state.strikes += 1
+                state.failures.append((now, type(error).__name__))
+                # Quota errors back off hard; timeouts/outages only briefly
+                base = self.cooldown_base if isinstance(error, ResourceExhausted) else self.cooldown_base / 4
+                delay = min(self.cooldown_max, base * 2 ** (state.strikes - 1))
+                state.cooldown_until = now + delay * random.uniform(0.5, 1.5)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            for state in self.keys: self._prune(state, now)
+            return [state.snapshot(now) for state in self.keys]
+
+    def client(self, state):
+        """
+        A GenerativeServiceClient bound to this key (created once per key).
+        """
+        with self._lock:
+            if state.client is None and self.client_factory:
+                state.client = self.client_factory(state.key)
+            if state.client is None:
+                from google.ai import generativelanguage as glm
+                from google.api_core.client_options import ClientOptions
+                state.client = glm.GenerativeServiceClient(client_options=ClientOptions(api_key=state.key))
+            return state.client
+
+    # --- EXECUTION ---
+    def _run(self, fn, state):
+        started = time.monotonic()
+        try:
+            result = fn(state)
+        except Exception as e:
+            self.release(state, error=e)
+            raise
+        self.release(state, latency=time.monotonic() - started)
+        return result
+
+    def call(self, fn, attempts=2, hedge_after=None):
+        """
+        Runs fn(key_state) on the healthiest key, retrying on another key on failure.
+        With hedge_after set, a request still pending after that many seconds is duplicated
+        onto a second key and the first successful answer wins.
+        """
+        tried = set()
+        last_error = None
+        for _ in range(attempts):
+            state = self.acquire(exclude=tried) or self.acquire()
+            if state is None: break
+            tried.add(state.index)
+
+            if not hedge_after or len(self.keys) < 2:
+                try:
+                    return self._run(fn, state)
+                except Exception as e:
+                    last_error = e
+                    continue
+
+            pending = {self._hedge_executor.submit(self._run, fn, state)}
+            done, pending = wait(pending, timeout=hedge_after)
+            if pending:
+                # Only a key that is ready now: waiting out a cooldown could outlast the request being hedged
+                backup = self.acquire(exclude=tried, wait=False)
+                if backup is not None:
+                    tried.add(backup.index)
+                    pending.add(self._hedge_executor.submit(self._run, fn, backup))
+
+            # Take the first success; a loser keeps running in the background and only updates stats
+            while done or pending:
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    last_error = future.exception()
+                if not pending: break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        if last_error: raise last_error
+        raise RuntimeError("No API key available.")
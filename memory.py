@@ -0,0 +1,114 @@
+SUMMARY_PREFIX = "(Summary of the earlier conversation)"
+
+
+def make_content(role, parts):
+    from google.generativeai import protos # deferred: only needed once a history is compacted
+    return protos.Content(role=role, parts=[p if isinstance(p, protos.Part) else protos.Part(text=p) for p in parts])
+
+
+def part_size(part):
+    if part.text: return len(part.text)
+    return len(str(part))
+
+def is_tool_part(part):
+    return bool(part.function_call) or bool(part.function_response)
+
+def estimate_tokens(contents):
+    """
+    Rough token count (~4 characters per token); good enough to budget with, and free.
+    """
+    return sum(part_size(part) for content in contents for part in content.parts) // 4
+
+
+class ConversationMemory:
+    """
+    Keeps a chat history inside a token budget.
+    - The most recent turns stay verbatim.
+    - Older turns are folded into a running summary, refreshed incrementally (old summary + newly folded turns).
+    - Function calls/results are dropped from every turn but the latest; the model's spoken answer is kept.
+    """
+
+    def __init__(self, budget=2000, summarize=None, keep_ratio=0.6):
+        self.budget = budget  # estimated tokens of replayed history
+        self.keep_ratio = keep_ratio  # once over budget, fold down to this fraction of it
+        self.summarize = summarize  # fn(previous_summary, transcript) -> new summary
+        self.summary = ""
+        self.last_compaction = None  # {'before': tokens, 'after': tokens, 'folded_turns': n}
+
+    def compact(self, history):
+        """
+        Returns a new history: [summary exchange] + recent turns.
+        """
+        history = list(history)
+        before = estimate_tokens(history)
+        if self._is_summary(history):
+            history = history[2:]
+
+        turns = self._split_turns(history)
+        turns = [self._strip_tools(turn) for turn in turns[:-1]] + turns[-1:]
+
+        folded = []
+        target = int(self.budget * self.keep_ratio)
+        if sum(estimate_tokens(t) for t in turns) > self.budget and self.summarize:
+            while len(turns) > 1 and sum(estimate_tokens(t) for t in turns) > target:
+                folded.append(turns.pop(0))
+
+        if folded:
+            try:
+                self.summary = self.summarize(self.summary, self._transcript(folded))
+            except Exception as e:
+                # Without a fresh summary, keep the turns verbatim rather than lose them
+                print(f"Summary refresh failed: {e}")
+                turns = folded + turns
+                folded = []
+
+        compacted = [content for turn in turns for content in turn]
+        if self.summary:
+            compacted = [
+                make_content("user", [f"{SUMMARY_PREFIX} {self.summary}"]),
+                make_content("model", ["Understood."]),
+            ] + compacted
+
+        self.last_compaction = {'before': before, 'after': estimate_tokens(compacted), 'folded_turns': len(folded)}
+        return compacted
+
+    # --- INTERNALS ---
+    @staticmethod
+    def _is_summary(history):
+        if len(history) < 2: return False
+        first = history[0]
+        return first.role == "user" and first.parts and first.parts[0].text.startswith(SUMMARY_PREFIX)
+
+    @staticmethod
+    def _split_turns(history):
+        # A turn starts at each user message that carries text (function results are not new turns)
+        turns = []
+        for content in history:
+            starts_turn = content.role == "user" and any(part.text for part in content.parts)
+            if starts_turn or not turns:
+                turns.append([])
+            turns[-1].append(content)
+        return turns
+
+    @staticmethod
+    def _strip_tools(turn):
+        stripped = []
+        for content in turn:
+            parts = [part for part in content.parts if not is_tool_part(part)]
+            if not parts: continue
+            # Dropping tool traffic can leave two model messages in a row; merge them
+            if stripped and stripped[-1]["role"] == content.role:
+                stripped[-1]["parts"].extend(parts)
+            else:
+                stripped.append({"role": content.role, "parts": parts})
+        return [make_content(c["role"], c["parts"]) for c in stripped]
+
+    @staticmethod
+    def _transcript(turns):
+        lines = []
+        for turn in turns:
+            for content in turn:
+                text = " ".join(part.text for part in content.parts if part.text)
+                if text:
+                    lines.append(f"{'User' if content.role == 'user' else 'Assistant'}: {text}")
+        return "\n".join(lines)
@@ -0,0 +1,130 @@
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+
+
+class NotificationDispatcher:
+    """
+    Background delivery for notification emails.
+    send() only queues the message. A worker thread keeps one logged-in SMTP connection open
+    (reconnecting when it drops), waits `window` seconds so a burst goes out as one digest,
+    and sends at most one email per `min_interval` seconds.
+    """
+
+    def __init__(self, sender, password=None, recipient=None, host="smtp.gmail.com", port=465, use_ssl=True,
+                 subject="Receptionist Alert", window=2.0, min_interval=10.0, timeout=15.0):
+        self.sender = sender
+        self.password = password  # no login when None, e.g. against a local aiosmtpd
+        self.recipient = recipient or sender
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.subject = subject
+        self.window = window  # seconds to wait for more messages before sending
+        self.min_interval = min_interval  # seconds between two emails
+        self.timeout = timeout
+
+        self._queue = []  # (queued_at, message)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._smtp = None
+        self._last_sent = 0.0
+        self.stats = {'queued': 0, 'emails': 0, 'messages': 0, 'connects': 0, 'failures': 0}
+
+    def send(self, message):
+        """
+        Queues one message for delivery. Returns immediately.
+        """
+        with self._lock:
+            self._queue.append((time.time(), message))
+            self.stats['queued'] += 1
+        self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def flush(self):
+        """
+        Sends everything queued as one email. Messages stay queued if delivery fails.
+        """
+        with self._lock:
+            batch = list(self._queue)
+        if not batch: return 0
+
+        self._deliver(self._compose([message for _, message in batch], [queued_at for queued_at, _ in batch]))
+
+        with self._lock:
+            del self._queue[:len(batch)]
+            self.stats['emails'] += 1
+            self.stats['messages'] += len(batch)
+        self._last_sent = time.monotonic()
+        return len(batch)
+
+    def start(self):
+        if self._thread: return
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._smtp is None: return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
+
+    # --- INTERNALS ---
+    def _compose(self, messages, times):
+        if len(messages) == 1:
+            msg = MIMEText(messages[0])
+            msg['Subject'] = self.subject
+        else:
+            lines = [f"{time.strftime('%I:%M %p', time.localtime(t)).lstrip('0')}  {m}" for t, m in zip(times, messages)]
+            msg = MIMEText("\n\n".join(lines))
+            msg['Subject'] = f"{self.subject} ({len(messages)} updates)"
+        msg['From'] = self.sender
+        msg['To'] = self.recipient
+        return msg
+
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.password:
+            smtp.login(self.sender, self.password)
+        self.stats['connects'] += 1
+        return smtp
+
+    def _deliver(self, msg):
+        # The server may have dropped an idle connection; one reconnect is expected, not an error
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(msg)
+                return
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self._smtp = None
+                if attempt: raise
+
+    def _run(self):
+        failures = 0
+        while True:
+            self._wake.wait()
+            # Let a burst accumulate, and keep to the send rate
+            time.sleep(max(self.window, self._last_sent + self.min_interval - time.monotonic()))
+            self._wake.clear()
+            try:
+                self.flush()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.stats['failures'] += 1
+                print(f"Notification delivery failed ({failures}): {e}")
+                self.close()
+                time.sleep(min(300, self.min_interval * 2 ** failures))
+                self._wake.set()
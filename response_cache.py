@@ -0,0 +1,54 @@
+import collections
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of finished replies, in front of the model.
+    Keys combine the normalized question, the date range it resolves to and the calendar version,
+    so "what's on today" stops matching at midnight or as soon as the calendar changes.
+    """
+
+    def __init__(self, max_entries=128, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds
+        self._entries = collections.OrderedDict()  # key -> (stored_at, reply)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, reply):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), reply)
+            self._entries.move_to_end(key)
+            self.stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self):
+        """
+        Drops everything; called whenever the calendar is mutated.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.stats['invalidations'] += 1
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
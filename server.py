@@ -0,0 +1,237 @@
+"""
+Headless ASGI service for the receptionist pipeline, without Streamlit.
+
+    POST /turn    {"text": "...", "session": "<id, optional>"} -> {"reply": "...", "session": "<id>"}
+    WS   /voice   per utterance, the client sends one binary WAV message (or {"text": "..."} as JSON);
+                  the server answers {"type": "transcript"}, then per sentence {"type": "sentence"} followed
+                  by that sentence's audio as one binary message, then {"type": "done"}
+    GET  /health  admission, session and executor counters
+
+    uvicorn server:app --port 8000
+
+The event loop only routes and relays: the blocking Google SDK calls run on a bounded executor,
+and at most MAX_IN_FLIGHT turns run at once. Up to MAX_QUEUED more wait; beyond that requests get 503.
+"""
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+import backend
+import tracing
+import voice_engine
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 32)) # threads for blocking SDK calls
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", backend.TOOL_WORKERS)) # turns running at once, one tool thread each
+MAX_QUEUED = int(os.getenv("MAX_QUEUED", 64)) # turns waiting for a slot before new ones are turned away
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 1000))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 1800)) # seconds
+
+executor = ThreadPoolExecutor(max_workers=SERVER_WORKERS, thread_name_prefix="api")
+
+
+class Busy(Exception):
+    pass
+
+
+class Admission:
+    """
+    Caps in-flight turns. Callers past the cap wait in line; once MAX_QUEUED are waiting, new ones are refused.
+    """
+
+    def __init__(self, max_in_flight, max_queued):
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.stats = {'in_flight': 0, 'queued': 0, 'admitted': 0, 'rejected': 0}
+
+    async def __aenter__(self):
+        if self._slots.locked() and self.stats['queued'] >= self.max_queued:
+            self.stats['rejected'] += 1
+            raise Busy()
+        self.stats['queued'] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats['queued'] -= 1
+        self.stats['in_flight'] += 1
+        self.stats['admitted'] += 1
+
+    async def __aexit__(self, *exc):
+        self.stats['in_flight'] -= 1
+        self._slots.release()
+
+
+class Sessions:
+    """
+    One ChatSession per client session id, evicted when idle or when there are too many.
+    Each has a lock, so a session's turns run one at a time.
+    """
+
+    def __init__(self, max_sessions, idle_ttl):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = collections.OrderedDict() # id -> [ChatSession, asyncio.Lock, last used]
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def get(self, session_id):
+        now = time.monotonic()
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) < self.max_sessions and now - oldest[2] < self.idle_ttl: break
+            del self._sessions[oldest_id]
+
+        session_id = session_id or uuid.uuid4().hex
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = [None, asyncio.Lock(), now]
+            self._sessions[session_id] = entry
+        entry[2] = now
+        self._sessions.move_to_end(session_id)
+        if entry[0] is None:
+            # Built under the session's lock, so concurrent first requests share one ChatSession.
+            # Building may load credentials, so it runs off the loop too
+            async with entry[1]:
+                if entry[0] is None: entry[0] = await run_blocking(backend.ChatSession)
+        return session_id, entry[0], entry[1]
+
+
+admission = None
+sessions = None
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Built here, not at import, so their asyncio primitives belong to the server's loop
+    global admission, sessions
+    admission = Admission(MAX_IN_FLIGHT, MAX_QUEUED)
+    sessions = Sessions(MAX_SESSIONS, SESSION_IDLE_TTL)
+    backend.replay_journal_in_background()
+    yield
+    executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, tracing.wrap(fn), *args)
+
+async def relay(make_iterator):
+    """
+    Iterates a blocking iterator on the executor and yields its items on the event loop.
+    Closing it early (e.g. the client went away) stops the iterator at its next item and closes it;
+    the close waits for that, so the caller's admission slot is held until the work has really stopped.
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    done = object()
+    stopped = threading.Event()
+
+    def pump():
+        iterator = make_iterator()
+        try:
+            for item in iterator:
+                if stopped.is_set(): break
+                loop.call_soon_threadsafe(items.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, e)
+        finally:
+            if hasattr(iterator, "close"): iterator.close()
+            loop.call_soon_threadsafe(items.put_nowait, done)
+
+    pumping = loop.run_in_executor(executor, tracing.wrap(pump))
+    try:
+        while True:
+            item = await items.get()
+            if item is done: break
+            if isinstance(item, Exception): raise item
+            yield item
+    finally:
+        stopped.set()
+        await pumping
+
+
+# --- ENDPOINTS ---
+async def turn(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict): return JSONResponse({"error": "Expected a JSON object."}, status_code=400)
+    text = str(body.get("text", "")).strip()
+    if not text: return JSONResponse({"error": "Missing 'text'."}, status_code=400)
+
+    try:
+        async with admission:
+            session_id, chat, lock = await sessions.get(body.get("session"))
+            async with lock:
+                with tracing.span("api.turn", session=session_id):
+                    reply = await run_blocking(backend.process_message, text, [], chat)
+    except Busy:
+        return JSONResponse({"error": "Too many turns in flight."}, status_code=503, headers={"Retry-After": "1"})
+    return JSONResponse({"reply": reply, "session": session_id})
+
+async def voice(websocket):
+    await websocket.accept()
+    session_id = websocket.query_params.get("session")
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect": break
+            try:
+                async with admission:
+                    session_id, chat, lock = await sessions.get(session_id)
+                    async with lock:
+                        with tracing.span("api.voice", session=session_id):
+                            await speak(websocket, message, chat, session_id)
+            except Busy:
+                await websocket.send_json({"type": "busy", "retry_after": 1})
+    except WebSocketDisconnect:
+        pass
+
+async def speak(websocket, message, chat, session_id):
+    if message.get("bytes") is not None:
+        text = await run_blocking(voice_engine.transcribe_audio, message["bytes"])
+    else:
+        text = typed_text(message.get("text"))
+    await websocket.send_json({"type": "transcript", "text": text, "session": session_id})
+    if not text:
+        await websocket.send_json({"type": "done", "reply": ""})
+        return
+
+    spoken = []
+    stream = lambda: voice_engine.stream_audio_response(backend.stream_message(text, [], chat))
+    async with contextlib.aclosing(relay(stream)) as replies:
+        async for sentence, audio in replies:
+            spoken.append(sentence)
+            await websocket.send_json({"type": "sentence", "text": sentence, "audio_bytes": len(audio or b"")})
+            if audio: await websocket.send_bytes(audio)
+    await websocket.send_json({"type": "done", "reply": " ".join(spoken)})
+
+def typed_text(raw):
+    # A text frame is {"text": "..."}; anything else is treated as an empty utterance
+    try:
+        body = json.loads(raw or "{}")
+    except ValueError:
+        return ""
+    return str(body.get("text", "")).strip() if isinstance(body, dict) else ""
+
+async def health(request):
+    return JSONResponse({
+        "admission": dict(admission.stats, max_in_flight=MAX_IN_FLIGHT, max_queued=MAX_QUEUED),
+        "sessions": len(sessions),
+        "workers": SERVER_WORKERS,
+    })
+
+
+app = Starlette(
+    routes=[Route("/turn", turn, methods=["POST"]), WebSocketRoute("/voice", voice), Route("/health", health)],
+    lifespan=lifespan,
+)
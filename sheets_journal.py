@@ -0,0 +1,83 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class SheetsJournal:
+    """
+    Write-behind queue for Sheets rows.
+    Rows are committed to a local SQLite journal first, then a background flusher sends everything
+    pending as one values().append per interval. Rows left over from a crash are replayed on start().
+    """
+
+    def __init__(self, service, spreadsheet_id, sheet_range, path="sheets_journal.db", interval=5.0, execute=None):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_range = sheet_range
+        self.interval = interval  # seconds between flushes; rows added meanwhile share one append
+        self.execute = execute or (lambda request: request.execute())
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS pending (id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def append(self, row):
+        """
+        Durably queues one row (a list of cell values). Returns immediately.
+        """
+        with self._lock:
+            self._db.execute("INSERT INTO pending (row) VALUES (?)", (json.dumps(row),))
+            self._db.commit()
+        self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def flush(self):
+        """
+        Sends every pending row in a single append. Rows stay journaled if the call fails.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, row FROM pending ORDER BY id").fetchall()
+        if not rows: return 0
+
+        values = [json.loads(row) for _, row in rows]
+        self.execute(self.service.spreadsheets().values().append(
+            spreadsheetId=self.spreadsheet_id, range=self.sheet_range, valueInputOption="USER_ENTERED",
+            body={'values': values}
+        ))
+
+        with self._lock:
+            self._db.execute("DELETE FROM pending WHERE id <= ?", (rows[-1][0],))
+            self._db.commit()
+        return len(rows)
+
+    def start(self):
+        """
+        Starts the background flusher. Anything already in the journal goes out on the first pass.
+        """
+        if self._thread: return
+        if self.pending(): self._wake.set()
+        self._thread = threading.Thread(target=self._run, name="sheets-journal", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        failures = 0
+        while True:
+            self._wake.wait()
+            # Let a burst of rows accumulate so it goes out as one request
+            time.sleep(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                print(f"Sheets flush failed ({failures}): {e}")
+                time.sleep(min(300, self.interval * 2 ** failures))
+                self._wake.set()
@@ -0,0 +1,88 @@
+import collections
+import math
+import re
+
+TITLE = re.compile(r"\[(.+?)\]\s*(.*)")
+
+
+def split_title(summary):
+    """
+    "[IEEE] Weekly sync" -> ("IEEE", "Weekly sync"), the convention add_to_schedule writes.
+    """
+    match = TITLE.match(summary or "")
+    if not match: return "", summary or ""
+    return match.group(1), match.group(2)
+
+def tokens(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+def trigrams(words):
+    grams = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TitleIndex:
+    """
+    In-memory fuzzy lookup over event titles and categories.
+    Whole tokens and character trigrams are both indexed, so "lab reprot" still finds "[LRE Project] Lab report".
+    similarity() is the share of the query's tokens/trigrams found in the title (0..1).
+    """
+
+    def __init__(self):
+        self._token_postings = collections.defaultdict(set)  # token -> event ids
+        self._trigram_postings = collections.defaultdict(set)  # trigram -> event ids
+        self._entries = {}  # event id -> (tokens, trigrams)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, event_id, summary):
+        self.remove(event_id)
+        category, title = split_title(summary)
+        words = set(tokens(title)) | set(tokens(category))
+        grams = trigrams(words)
+        self._entries[event_id] = (words, grams)
+        for word in words: self._token_postings[word].add(event_id)
+        for gram in grams: self._trigram_postings[gram].add(event_id)
+
+    def remove(self, event_id):
+        entry = self._entries.pop(event_id, None)
+        if not entry: return
+        words, grams = entry
+        for word in words:
+            self._token_postings[word].discard(event_id)
+            if not self._token_postings[word]: del self._token_postings[word]
+        for gram in grams:
+            self._trigram_postings[gram].discard(event_id)
+            if not self._trigram_postings[gram]: del self._trigram_postings[gram]
+
+    def clear(self):
+        self._token_postings.clear()
+        self._trigram_postings.clear()
+        self._entries.clear()
+
+    def search(self, query, min_similarity=0.5):
+        """
+        {event_id: similarity} for every event at or above min_similarity.
+        """
+        words = set(tokens(query))
+        if not words: return {}
+        grams = trigrams(words)
+
+        # A match needs at least `need` of the query's trigrams, so it must appear in one of the
+        # len - need + 1 rarest postings; common trigrams ("ent", "ing") are only probed, never scanned
+        need = max(1, math.ceil((min_similarity - 0.3) / 0.7 * len(grams)))
+        postings = sorted((self._trigram_postings.get(gram, ()) for gram in grams), key=len)
+        candidates = set().union(*postings[:len(postings) - need + 1])
+
+        scores = {}
+        for event_id in candidates:
+            gram_hits = sum(1 for posting in postings if event_id in posting)
+            token_hits = sum(1 for word in words if event_id in self._token_postings.get(word, ()))
+            # Trigrams carry misspellings; exact tokens break ties in favour of the right words
+            similarity = 0.7 * gram_hits / len(grams) + 0.3 * token_hits / len(words)
+            if similarity >= min_similarity: scores[event_id] = similarity
+        return scores
@@ -0,0 +1,233 @@
+"""
+Timing spans for each stage of a turn (speech-to-text, model calls, tools, summaries, TTS, UI waits).
+
+    with tracing.span("tool.check_schedule", tool="check_schedule") as s:
+        ...
+        s.set(events=3)
+
+Finished spans feed per-name latency histograms (tracer.histograms()) and any exporters:
+JSON lines (TRACE_JSONL_PATH) and/or OTLP/HTTP JSON to a local OpenTelemetry collector
+(OTEL_EXPORTER_OTLP_ENDPOINT, e.g. http://localhost:4318). Neither needs extra packages.
+"""
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, float("inf"))
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._started = time.perf_counter()
+        self.duration = None  # seconds
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'start_ns': self.start_ns, 'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes, 'error': self.error,
+        }
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        for index, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        # Upper bound of the bucket holding the pct-th sample (capped at the largest seen)
+        target = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if count and seen >= target: return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count, 'mean_ms': round(self.total / self.count, 1) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 1), 'p95_ms': round(self.percentile(95), 1),
+            'p99_ms': round(self.percentile(99), 1),
+            'max_ms': round(self.max, 1),
+        }
+
+
+class Tracer:
+    """
+    Collects finished spans: keeps the most recent ones, a histogram per span name, and hands each to the exporters.
+    """
+
+    def __init__(self, keep=500):
+        self.recent = collections.deque(maxlen=keep)
+        self.exporters = []
+        self._histograms = collections.defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, _current.get(), attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass  # a generator closed from another context; that context never saw the span
+            self.finish(span)
+
+    def finish(self, span):
+        span.duration = time.perf_counter() - span._started
+        span.end_ns = span.start_ns + int(span.duration * 1e9)
+        with self._lock:
+            self.recent.append(span)
+            self._histograms[span.name].add(span.duration * 1000)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+
+    def histograms(self):
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self._histograms.clear()
+
+
+class JsonlExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class OtlpExporter:
+    """
+    Sends spans to an OpenTelemetry collector as OTLP/HTTP JSON, batched on a background thread.
+    """
+
+    def __init__(self, endpoint, service_name="naomi", interval=2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=10000)
+        threading.Thread(target=self._run, name="otlp-export", daemon=True).start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass  # never block a turn on telemetry
+
+    def _run(self):
+        while True:
+            spans = [self._queue.get()]
+            time.sleep(self.interval)
+            while not self._queue.empty() and len(spans) < 512:
+                spans.append(self._queue.get_nowait())
+            try:
+                self._post(spans)
+            except Exception as e:
+                print(f"OTLP export failed ({len(spans)} spans dropped): {e}")
+
+    def _post(self, spans):
+        import urllib.request
+        body = {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{'scope': {'name': 'naomi.tracing'}, 'spans': [_otlp_span(s) for s in spans]}],
+        }]}
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body).encode(), headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool): return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int): return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float): return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+def _otlp_span(span):
+    data = {
+        'traceId': span.trace_id, 'spanId': span.span_id, 'name': span.name, 'kind': 1,
+        'startTimeUnixNano': str(span.start_ns), 'endTimeUnixNano': str(span.end_ns),
+        'attributes': [_otlp_attribute(k, v) for k, v in span.attributes.items() if v is not None],
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+    }
+    if span.parent_id: data['parentSpanId'] = span.parent_id
+    return data
+
+
+# --- MODULE-LEVEL TRACER ---
+tracer = Tracer()
+span = tracer.span
+
+def current():
+    return _current.get()
+
+def annotate(**attributes):
+    """
+    Adds attributes to the innermost open span, if any.
+    """
+    active = _current.get()
+    if active: active.set(**attributes)
+
+def wrap(fn):
+    """
+    Binds fn to the caller's context, so work handed to a thread pool nests under the current span
+    (and sees every other context variable, e.g. the backend context of the session that submitted it).
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+def configure(jsonl_path=None, otlp_endpoint=None):
+    if jsonl_path: tracer.exporters.append(JsonlExporter(jsonl_path))
+    if otlp_endpoint: tracer.exporters.append(OtlpExporter(otlp_endpoint))
+
+configure(os.getenv("TRACE_JSONL_PATH"), os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
@@ -0,0 +1,101 @@
+import collections
+import hashlib
+import os
+import threading
+
+
+class AudioCache:
+    """
+    Two-tier cache of synthesized speech: an in-memory LRU in front of a directory of audio files.
+    Entries are content-addressed by sha256(voice, format, text), so they never go stale,
+    and a reply heard once (or pre-synthesized at startup) plays back without calling the TTS service.
+    """
+
+    def __init__(self, directory=".tts_cache", max_entries=256, max_files=2000):
+        self.directory = directory
+        self.max_entries = max_entries  # in memory
+        self.max_files = max_files  # on disk; the oldest files are pruned beyond this
+        self._memory = collections.OrderedDict()  # key -> bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bytes_served': 0, 'stores': 0}
+
+    @staticmethod
+    def key(text, voice, audio_format):
+        return hashlib.sha256(f"{voice}\0{audio_format}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                self.stats['bytes_served'] += len(data)
+                return data
+
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))  # pruning goes by mtime, so keep files in use
+        except OSError:
+            with self._lock: self.stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self._remember(key, data)
+            self.stats['disk_hits'] += 1
+            self.stats['bytes_served'] += len(data)
+        return data
+
+    def put(self, key, data):
+        if not data: return
+        with self._lock:
+            self._remember(key, data)
+            self.stats['stores'] += 1
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        try:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename, so a concurrent reader never sees half a file
+            temp = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+            if prune: self._prune()
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory: return True
+        return os.path.exists(self._path(key))
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats, memory_entries=len(self._memory))
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    # --- INTERNALS ---
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.audio")
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            files += [os.path.join(root, name) for name in names if name.endswith(".audio")]
+        if len(files) <= self.max_files: return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,149 +1,268 @@
+import base64
+import functools
+import json
+
 import streamlit as st
+import streamlit.components.v1 as components
 
-def render_jarvis_ui(state="idle"):
-    """
-    Renders the N.A.O.M.I v15.3 UI (Compact Version).
-    """
-    
-    # --- COLOR PALETTE ---
-    colors = {
-        "idle": "#00f3ff",      # Cyan
-        "listening": "#d600ff", # Neon Purple
-        "thinking": "#ffaa00",  # Amber/Gold
-        "speaking": "#ffffff"   # White
+# --- COLOR PALETTE ---
+COLORS = {
+    "idle": "#00f3ff",      # Cyan
+    "listening": "#d600ff", # Neon Purple
+    "thinking": "#ffaa00",  # Amber/Gold
+    "speaking": "#ffffff"   # White
+}
+
+FONTS_CSS = """
+    /* Served locally: an installed copy first, then static/fonts/ (app/static/ with static serving on) */
+    @font-face { font-family: 'Orbitron'; font-weight: 900; font-display: swap;
+        src: local('Orbitron Black'), local('Orbitron-Black'), url('app/static/fonts/Orbitron.woff2') format('woff2'); }
+    @font-face { font-family: 'Rajdhani'; font-weight: 500; font-display: swap;
+        src: local('Rajdhani Medium'), local('Rajdhani-Medium'), url('app/static/fonts/Rajdhani-Medium.woff2') format('woff2'); }
+"""
+
+REACTOR_CSS = """
+    /* 1. MAIN CONTAINER */
+    .jarvis-container {
+        position: relative;
+        width: 100%;
+        height: 350px; 
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        background: transparent;
+        overflow: visible;
+        font-family: 'Orbitron', sans-serif;
+        margin-bottom: 0px;
     }
-    
-    c = colors.get(state, colors["idle"])
-    
-    css_code = f"""
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@900&display=swap');
-        @import url('https://fonts.googleapis.com/css2?family=Rajdhani:wght@500&display=swap');
-
-        /* 1. MAIN CONTAINER */
-        .jarvis-container {{
-            position: relative;
-            width: 100%;
-            height: 350px; 
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            background: transparent;
-            overflow: visible;
-            font-family: 'Orbitron', sans-serif;
-            margin-bottom: 0px;
-        }}
 
-        /* 2. THE REACTOR */
-        .reactor {{
-            position: relative;
-            width: 300px;
-            height: 300px;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            transition: transform 0.8s cubic-bezier(0.2, 0.8, 0.2, 1);
-        }}
+    /* 2. THE REACTOR */
+    .reactor {
+        position: relative;
+        width: 300px;
+        height: 300px;
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        transition: transform 0.8s cubic-bezier(0.2, 0.8, 0.2, 1);
+    }
 
-        /* --- TITLE --- */
-        .core-text {{
-            position: absolute;
-            z-index: 20;
-            font-size: 24px;
-            font-weight: 900;
-            letter-spacing: 6px;
-            background: linear-gradient(90deg, {c}40 0%, {c} 50%, {c}40 100%);
-            background-size: 200% auto;
-            color: #000;
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            animation: text-shimmer 3s linear infinite;
-        }}
+    /* --- TITLE --- */
+    .core-text {
+        position: absolute;
+        z-index: 20;
+        font-size: 24px;
+        font-weight: 900;
+        letter-spacing: 6px;
+        background: linear-gradient(90deg, var(--c-dim) 0%, var(--c) 50%, var(--c-dim) 100%);
+        background-size: 200% auto;
+        color: #000;
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        animation: text-shimmer 3s linear infinite;
+    }
 
-        /* --- ORGANIC RINGS --- */
-        .blob-ring {{
-            position: absolute;
-            border-radius: 50%;
-            transition: all 0.5s ease;
-            box-shadow: 0 0 20px {c}40;
-        }}
+    /* --- ORGANIC RINGS --- */
+    .blob-ring {
+        position: absolute;
+        border-radius: 50%;
+        transition: all 0.5s ease;
+        box-shadow: 0 0 20px var(--c-dim);
+    }
 
-        .ring-1 {{ width: 260px; height: 260px; border: 4px solid {c}; animation: wobble-1 10s ease-in-out infinite; }}
-        .ring-2 {{ width: 280px; height: 280px; border: 2px solid {c}; opacity: 0.4; animation: wobble-2 15s ease-in-out infinite; }}
-        .ring-3 {{ width: 240px; height: 240px; border: 1px solid {c}; opacity: 0.6; animation: wobble-3 8s ease-in-out infinite; }}
-
-        /* --- KEYFRAMES --- */
-        @keyframes wobble-1 {{ 0%, 100% {{ border-radius: 60% 40% 30% 70% / 60% 30% 70% 40%; transform: rotate(0deg); }} 50% {{ border-radius: 30% 60% 70% 40% / 50% 60% 30% 60%; transform: rotate(180deg); }} }}
-        @keyframes wobble-2 {{ 0%, 100% {{ border-radius: 50% 50% 50% 50% / 50% 50% 50% 50%; transform: rotate(0deg); }} 33% {{ border-radius: 70% 30% 50% 50% / 30% 30% 70% 70%; transform: rotate(120deg); }} 66% {{ border-radius: 30% 70% 70% 30% / 30% 30% 30% 30%; transform: rotate(240deg); }} }}
-        @keyframes wobble-3 {{ 0%, 100% {{ border-radius: 40% 60% 60% 40% / 60% 30% 70% 40%; transform: rotate(0deg); }} 50% {{ border-radius: 60% 40% 30% 70% / 60% 30% 70% 40%; transform: rotate(-180deg); }} }}
-        @keyframes text-shimmer {{ 0% {{ background-position: 200% center; }} 100% {{ background-position: -200% center; }} }}
-
-        /* --- STATE OVERRIDES --- */
-        .reactor.listening {{ transform: scale(1.05); }}
-        .reactor.listening .blob-ring {{ opacity: 0.8; box-shadow: 0 0 40px {c}60; }}
-        .reactor.thinking .blob-ring {{ animation-duration: 3s; animation-timing-function: cubic-bezier(0.86, 0, 0.07, 1); border-width: 5px; opacity: 1; }}
-        .reactor.speaking {{ animation: breath-pulse 3s ease-in-out infinite; }}
-        @keyframes breath-pulse {{ 0% {{ transform: scale(1); }} 50% {{ transform: scale(1.12); }} 100% {{ transform: scale(1); }} }}
-    </style>
+    .ring-1 { width: 260px; height: 260px; border: 4px solid var(--c); animation: wobble-1 10s ease-in-out infinite; }
+    .ring-2 { width: 280px; height: 280px; border: 2px solid var(--c); opacity: 0.4; animation: wobble-2 15s ease-in-out infinite; }
+    .ring-3 { width: 240px; height: 240px; border: 1px solid var(--c); opacity: 0.6; animation: wobble-3 8s ease-in-out infinite; }
+
+    /* --- KEYFRAMES --- */
+    @keyframes wobble-1 { 0%, 100% { border-radius: 60% 40% 30% 70% / 60% 30% 70% 40%; transform: rotate(0deg); } 50% { border-radius: 30% 60% 70% 40% / 50% 60% 30% 60%; transform: rotate(180deg); } }
+    @keyframes wobble-2 { 0%, 100% { border-radius: 50% 50% 50% 50% / 50% 50% 50% 50%; transform: rotate(0deg); } 33% { border-radius: 70% 30% 50% 50% / 30% 30% 70% 70%; transform: rotate(120deg); } 66% { border-radius: 30% 70% 70% 30% / 30% 30% 30% 30%; transform: rotate(240deg); } }
+    @keyframes wobble-3 { 0%, 100% { border-radius: 40% 60% 60% 40% / 60% 30% 70% 40%; transform: rotate(0deg); } 50% { border-radius: 60% 40% 30% 70% / 60% 30% 70% 40%; transform: rotate(-180deg); } }
+    @keyframes text-shimmer { 0% { background-position: 200% center; } 100% { background-position: -200% center; } }
+
+    /* --- STATE OVERRIDES --- */
+    .reactor.listening { transform: scale(1.05); }
+    .reactor.listening .blob-ring { opacity: 0.8; box-shadow: 0 0 40px var(--c-glow); }
+    .reactor.thinking .blob-ring { animation-duration: 3s; animation-timing-function: cubic-bezier(0.86, 0, 0.07, 1); border-width: 5px; opacity: 1; }
+    .reactor.speaking { animation: breath-pulse 3s ease-in-out infinite; }
+    @keyframes breath-pulse { 0% { transform: scale(1); } 50% { transform: scale(1.12); } 100% { transform: scale(1); } }
+
+    /* --- CLIENT-SIDE HAND-OFF (delay set inline) --- */
+    .reactor-layer { position: absolute; inset: 0; display: flex; justify-content: center; align-items: center; }
+    .reactor-layer.leaving { animation: layer-out 0.6s ease forwards; }
+    .reactor-layer.arriving { opacity: 0; animation: layer-in 0.6s ease forwards; }
+    @keyframes layer-out { to { opacity: 0; visibility: hidden; } }
+    @keyframes layer-in { to { opacity: 1; } }
+"""
+
+# Each state's palette, as custom properties on its class
+PALETTE_CSS = "".join(
+    f"    .reactor.{state} {{ --c: {c}; --c-dim: {c}40; --c-glow: {c}60; }}\n" for state, c in COLORS.items()
+)
+
+SUBTITLE_CSS = """
+    .cinematic-subtitle {
+        text-align: center;
+        font-family: 'Rajdhani', sans-serif;
+        font-size: 20px;
+        color: #e0e0e0;
+        background: rgba(0, 0, 0, 0.8);
+        padding: 20px;
+        border-radius: 12px;
+        max-width: 800px;
+        margin: -10px auto 20px auto; 
+        border-left: 4px solid #00f3ff;
+        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.6);
+        position: relative;
+        z-index: 100;
+        animation: fadein 0.5s forwards;
+        line-height: 1.5;
+    }
+    
+    /* Markdown formatting for lists inside the subtitle */
+    .cinematic-subtitle ul, .cinematic-subtitle ol {
+        text-align: left;
+        display: inline-block; /* Keeps the list block centered, but text left-aligned */
+        margin-top: 10px;
+        color: #00ff9d; /* Give lists a cool green tint */
+    }
+    
+    .cinematic-subtitle li {
+        margin-bottom: 5px;
+    }
+
+    @keyframes fadein { from { opacity: 0; transform: translateY(5px); } to { opacity: 1; transform: translateY(0); } }
+    @keyframes fadeout { to { opacity: 0; visibility: hidden; max-height: 0; padding: 0; margin: 0; overflow: hidden; } }
+"""
+
+def inject_styles(extra_css=""):
     """
+    Ships the static stylesheet (fonts, reactor, palette, subtitles, plus `extra_css`) once per browser session.
+    It goes into the parent page's <head>, where it outlives reruns, so state changes only send class names.
+    """
+    if st.session_state.get("styles_injected"):
+        return
+    css = FONTS_CSS + REACTOR_CSS + PALETTE_CSS + SUBTITLE_CSS + extra_css
+    components.html(f"""
+    <script>
+        const doc = window.parent.document;
+        let sheet = doc.getElementById("naomi-styles");
+        if (!sheet) {{
+            sheet = doc.createElement("style");
+            sheet.id = "naomi-styles";
+            doc.head.appendChild(sheet);
+        }}
+        sheet.textContent = {json.dumps(css)};
+    </script>
+    """, height=0)
+    st.session_state.styles_injected = True
 
-    html_code = f"""
-    <div class="jarvis-container">
+def reactor_html(state):
+    return f"""
         <div class="reactor {state}">
             <div class="blob-ring ring-2"></div>
             <div class="blob-ring ring-1"></div>
             <div class="blob-ring ring-3"></div>
             <div class="core-text">N.A.O.M.I.</div>
+        </div>"""
+
+def render_jarvis_ui(state="idle", then=None, after=0.0):
+    """
+    Renders the N.A.O.M.I v15.3 UI (Compact Version). Styles come from inject_styles().
+    With `then`, the browser itself cross-fades to that state `after` seconds from now
+    (e.g. back to idle when the reply finishes playing), so the server never waits for it.
+    """
+    if then is None:
+        html_code = f"""
+    <div class="jarvis-container">{reactor_html(state)}
+    </div>
+    """
+    else:
+        html_code = f"""
+    <div class="jarvis-container">
+        <div class="reactor-layer leaving" style="animation-delay: {after:.2f}s;">{reactor_html(state)}
+        </div>
+        <div class="reactor-layer arriving" style="animation-delay: {after:.2f}s;">{reactor_html(then)}
         </div>
     </div>
     """
     
-    st.markdown(css_code + html_code, unsafe_allow_html=True)
+    st.markdown(html_code, unsafe_allow_html=True)
 
-def render_subtitles(text):
+def render_subtitles(text, hide_after=None):
     """
     Renders subtitles with built-in markdown/list handling.
+    With `hide_after`, the browser fades them out after that many seconds.
     """
     if not text:
         return
-        
-    st.markdown(f"""
-    <style>
-        .cinematic-subtitle {{
-            text-align: center;
-            font-family: 'Rajdhani', sans-serif;
-            font-size: 20px;
-            color: #e0e0e0;
-            background: rgba(0, 0, 0, 0.8);
-            padding: 20px;
-            border-radius: 12px;
-            max-width: 800px;
-            margin: -10px auto 20px auto; 
-            border-left: 4px solid #00f3ff;
-            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.6);
-            position: relative;
-            z-index: 100;
-            animation: fadein 0.5s forwards;
-            line-height: 1.5;
-        }}
-        
-        /* Markdown formatting for lists inside the subtitle */
-        .cinematic-subtitle ul, .cinematic-subtitle ol {{
-            text-align: left;
-            display: inline-block; /* Keeps the list block centered, but text left-aligned */
-            margin-top: 10px;
-            color: #00ff9d; /* Give lists a cool green tint */
-        }}
-        
-        .cinematic-subtitle li {{
-            margin-bottom: 5px;
-        }}
 
-        @keyframes fadein {{ from {{ opacity: 0; transform: translateY(5px); }} to {{ opacity: 1; transform: translateY(0); }} }}
-    </style>
-    
-    <div class="cinematic-subtitle">
+    hide = f' style="animation: fadein 0.5s forwards, fadeout 0.6s ease {hide_after:.2f}s forwards;"' if hide_after is not None else ""
+
+    st.markdown(f"""
+    <div class="cinematic-subtitle"{hide}>
         {text}
 
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+# Defined in the parent page (not the component iframe) so playback survives reruns that remove the iframe
+AUDIO_QUEUE_JS = """
+window.naomiAudio = {
+    queue: [],
+    playing: false,
+    next() {
+        if (this.playing || !this.queue.length) return;
+        this.playing = true;
+        const clip = new Audio(this.queue.shift());
+        const done = () => { this.playing = false; this.next(); };
+        clip.onended = done;
+        clip.onerror = done;
+        clip.play().catch(done);
+    }
+};
+"""
+
+def render_audio_chunk(audio_bytes, mime="audio/mp3"):
+    """
+    Queues one chunk of speech for gapless playback in the browser.
+    Chunks play in arrival order, so the first sentence starts while later ones are still being synthesized.
+    """
+    if not audio_bytes:
+        return
+
+    data_uri = f"data:{mime};base64,{base64.b64encode(audio_bytes).decode()}"
+    components.html(f"""
+    <script>
+        const w = window.parent;
+        if (!w.naomiAudio) w.eval({json.dumps(AUDIO_QUEUE_JS)});
+        w.naomiAudio.queue.push({json.dumps(data_uri)});
+        w.naomiAudio.next();
+    </script>
+    """, height=0)
+
+# Messages per rendered block: a full block never changes, so it is formatted once and sent as one element
+LOG_BLOCK = 10
+
+@functools.lru_cache(maxsize=512)
+def format_log_block(block):
+    """
+    One markdown string for a tuple of (role, content) pairs, each followed by a divider.
+    """
+    entries = []
+    for role, content in block:
+        if role == "user":
+            entries.append(f"<span style='color:#00f3ff; font-weight:bold;'>[USER UPLINK]:</span> {content}")
+        else:
+            # AI responses use standard markdown, rendering bullets beautifully
+            entries.append(f"<span style='color:#00ff9d; font-weight:bold;'>[N.A.O.M.I]:</span>\n\n{content}")
+    return "".join(f"{entry}\n\n---\n\n" for entry in entries)
+
+def render_log(messages, limit):
+    """
+    Renders the last `limit` messages of the System Log (from the start of a block), one element per block.
+    """
+    first = max(0, len(messages) - limit) // LOG_BLOCK * LOG_BLOCK
+    for start in range(first, len(messages), LOG_BLOCK):
+        block = tuple((msg["role"], msg["content"]) for msg in messages[start:start + LOG_BLOCK])
+        st.markdown(format_log_block(block), unsafe_allow_html=True)
@@ -1,6 +1,6 @@
 # visual_test.py
 import streamlit as st
-from ui_components import render_jarvis_ui
+from ui_components import inject_styles, render_jarvis_ui
 
 st.set_page_config(page_title="JARVIS Interface", page_icon="🤖", layout="wide")
 
@@ -12,6 +12,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+inject_styles()
+
 st.title("J.A.R.V.I.S. // VISUAL SYSTEM")
 
 # Manual controls to test the states
@@ -1,45 +1,258 @@
 import speech_recognition as sr
 import edge_tts
 import asyncio
+import audioop # ships with SpeechRecognition (as audioop-lts on Python 3.13+)
 import io
+import os
+import queue
+import re
+import threading
+import time
+
+import tracing
+from tts_cache import AudioCache
+
+VOICE = "en-GB-RyanNeural"
+AUDIO_FORMAT = "audio-24khz-48kbitrate-mono-mp3"  # what edge-tts streams by default
+AUDIO_BITRATE = 48000  # bits per second of AUDIO_FORMAT (constant bitrate)
+
+# Replies already synthesized once (or pre-synthesized at startup) are served from here
+audio_cache = AudioCache(directory=os.getenv("TTS_CACHE_DIR", ".tts_cache"))
 
 # --- 1. THE EARS (Speech to Text) ---
-def transcribe_audio(file_path):
+STT_SAMPLE_RATE = 16000 # the rate the Google recognizer is tuned for; anything above it is wasted upload
+VAD_FRAME_MS = 30
+VAD_PADDING_MS = 250 # kept either side of the speech so word edges are not clipped
+VAD_MIN_RMS = 300 # 16-bit RMS below which a frame is always silence
+
+def prepare_audio(audio_data):
+    """
+    Mono 16-bit audio at STT_SAMPLE_RATE with leading and trailing silence trimmed, or None if nothing was said.
+    Speech is found with an energy gate: frames louder than 3x the recording's own noise floor.
+    """
+    rate = min(audio_data.sample_rate, STT_SAMPLE_RATE)
+    raw = audio_data.get_raw_data(convert_rate=rate, convert_width=2)
+    frame = rate * VAD_FRAME_MS // 1000 * 2
+    energies = [audioop.rms(raw[i:i + frame], 2) for i in range(0, len(raw), frame)]
+    if not energies: return None
+
+    noise_floor = sorted(energies)[len(energies) // 10]
+    threshold = max(VAD_MIN_RMS, 3 * noise_floor)
+    voiced = [i for i, energy in enumerate(energies) if energy > threshold]
+    if not voiced: return None
+
+    padding = VAD_PADDING_MS // VAD_FRAME_MS
+    first, last = max(0, voiced[0] - padding), min(len(energies), voiced[-1] + padding + 1)
+    return sr.AudioData(raw[first * frame:last * frame], rate, 2)
+
+def transcribe_audio(audio):
     """
-    Transcribes a WAV file from the UI.
+    Transcribes a WAV recording from the UI, given as bytes, a file-like object or a path.
     """
+    if isinstance(audio, (bytes, bytearray)): audio = io.BytesIO(audio)
     recognizer = sr.Recognizer()
-    try:
-        with sr.AudioFile(file_path) as source:
-            audio_data = recognizer.record(source)
-            text = recognizer.recognize_google(audio_data)
+    with tracing.span("stt") as span:
+        try:
+            with sr.AudioFile(audio) as source:
+                audio_data = recognizer.record(source)
+            span.set(audio_bytes=len(audio_data.frame_data), sample_rate=audio_data.sample_rate,
+                     audio_seconds=round(len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width), 2))
+
+            with tracing.span("stt.prepare"):
+                speech = prepare_audio(audio_data)
+            if speech is None:
+                span.set(silent=True)
+                return None
+            span.set(speech_bytes=len(speech.frame_data), speech_seconds=round(len(speech.frame_data) / (speech.sample_rate * 2), 2))
+
+            text = recognizer.recognize_google(speech)
+            span.set(text_chars=len(text))
             return text
-    except Exception as e:
-        print(f"Transcription Error: {e}")
-        return None
+        except Exception as e:
+            print(f"Transcription Error: {e}")
+            span.set(failed=True)
+            return None
 
 # --- 2. THE MOUTH (Text to Speech) ---
-async def _generate_audio(text, voice="en-GB-RyanNeural"):
+# All synthesis runs on one long-lived event loop in a background thread; any thread can submit to it
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", 8)) # utterances synthesized at the same time
+
+_loop = None
+_loop_lock = threading.Lock()
+_slots = asyncio.Semaphore(TTS_CONCURRENCY) # binds to _loop on first use
+
+def get_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="tts-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def submit(coro):
+    """
+    Schedules a coroutine on the voice loop. Returns a concurrent.futures.Future.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+async def _synthesize(text, voice=VOICE):
     """
-    Generates audio bytes in memory (no files needed).
+    Raw edge-tts audio chunks, as they arrive.
     """
     communicate = edge_tts.Communicate(text, voice)
-    # capturing the audio stream into memory
-    audio_stream = io.BytesIO()
     async for chunk in communicate.stream():
         if chunk["type"] == "audio":
-            audio_stream.write(chunk["data"])
-    
-    audio_stream.seek(0)
-    return audio_stream
+            yield chunk["data"]
+
+async def stream_audio(text, voice=VOICE):
+    """
+    Async API: yields the audio of one utterance chunk by chunk as it arrives.
+    A cached utterance comes back as a single chunk.
+    """
+    key = audio_cache.key(text, voice, AUDIO_FORMAT)
+    cached = audio_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    async with _slots:
+        async for chunk in _synthesize(text, voice):
+            chunks.append(chunk)
+            yield chunk
+    audio_cache.put(key, b"".join(chunks))
+
+async def synthesize(text, voice=VOICE):
+    """
+    Async API: the whole utterance as bytes, or None on failure.
+    """
+    with tracing.span("tts", text_chars=len(text)) as span:
+        try:
+            chunks = [chunk async for chunk in stream_audio(text, voice)]
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            span.set(failed=True)
+            return None
+        audio = b"".join(chunks)
+        span.set(audio_bytes=len(audio), chunks=len(chunks))
+        return audio
+
+def iter_audio_chunks(text, voice=VOICE):
+    """
+    Sync bridge over stream_audio: yields chunks on the calling thread as the loop receives them.
+    """
+    chunks = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for chunk in stream_audio(text, voice):
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(done)
+
+    submit(pump())
+    while True:
+        item = chunks.get()
+        if item is done: return
+        if isinstance(item, Exception): raise item
+        yield item
 
 def get_audio_response(text):
     """
-    Synchronous wrapper that returns the audio data as bytes.
+    Synchronous wrapper that returns the audio as a BytesIO (None on failure).
+    """
+    audio = submit(synthesize(text)).result()
+    return io.BytesIO(audio) if audio else None
+
+def audio_duration(audio_bytes):
+    """
+    Seconds of speech in a clip from the TTS stream, from its size at the constant bitrate.
+    """
+    return len(audio_bytes) * 8 / AUDIO_BITRATE if audio_bytes else 0.0
+
+def presynthesize(phrases):
+    """
+    Fills the cache with fixed replies, concurrently, so they never wait on synthesis.
+    Returns a Future that resolves once they are all cached.
     """
+    async def run():
+        missing = [phrase for phrase in phrases if audio_cache.key(phrase, VOICE, AUDIO_FORMAT) not in audio_cache]
+        await asyncio.gather(*(synthesize(phrase) for phrase in missing))
+    return submit(run())
+
+# --- 3. STREAMING MOUTH (LLM text stream -> per-sentence audio) ---
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text_chunks, min_chars=24):
+    """
+    Re-chunks streamed text at sentence boundaries.
+    Very short sentences are held back and merged so each TTS call has enough to say.
+    """
+    buffer = ""
+    for chunk in text_chunks:
+        buffer += chunk
+        parts = SENTENCE_END.split(buffer)
+        buffer = parts.pop()
+        pending = ""
+        for sentence in parts:
+            pending = f"{pending} {sentence}".strip()
+            if len(pending) >= min_chars:
+                yield pending
+                pending = ""
+        if pending:
+            buffer = f"{pending} {buffer}"
+    if buffer.strip():
+        yield buffer.strip()
+
+def stream_audio_response(text_chunks, stats=None):
+    """
+    Yields (sentence, audio_bytes) as soon as each sentence of a streamed reply is synthesized.
+    The text stream is drained on a background thread, so the LLM keeps generating while we synthesize,
+    and each sentence is submitted to the voice loop the moment it is complete, overlapping with the ones before it.
+    `stats` (optional dict) receives time_to_first_audio, total_time and audio_seconds (length of the speech).
+    Closing it early stops the text stream at the next sentence and cancels synthesis nobody will hear.
+    """
+    started = time.perf_counter()
+    sentences = queue.Queue()
+    done = object()
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for sentence in split_sentences(text_chunks):
+                if stopped.is_set(): break
+                sentences.put((sentence, submit(synthesize(sentence))))
+        except Exception as e:
+            print(f"Text Stream Error: {e}")
+        finally:
+            # Closed here, on the thread that iterates it, so the model stream ends too
+            if stopped.is_set() and hasattr(text_chunks, "close"): text_chunks.close()
+            sentences.put(done)
+
+    # The text stream (and its model/tool spans) runs on this thread, but nests under the caller's span
+    threading.Thread(target=tracing.wrap(produce), daemon=True).start()
+
     try:
-        audio_io = asyncio.run(_generate_audio(text))
-        return audio_io
-    except Exception as e:
-        print(f"TTS Error: {e}")
-        return None
\ No newline at end of file
+        while True:
+            item = sentences.get()
+            if item is done: break
+            sentence, future = item
+            audio = future.result()
+            if stats is not None and audio:
+                stats.setdefault('time_to_first_audio', time.perf_counter() - started)
+                stats['audio_seconds'] = stats.get('audio_seconds', 0.0) + audio_duration(audio)
+            yield sentence, audio
+    finally:
+        stopped.set()
+        while True:
+            try: item = sentences.get_nowait()
+            except queue.Empty: break
+            if item is not done: item[1].cancel()
+
+    if stats is not None:
+        stats['total_time'] = time.perf_counter() - started
\ No newline at end of file